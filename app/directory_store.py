@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Generic, Iterable, TypeVar
+
+_WAL_ENABLED_PATHS: set[Path] = set()
+_THREAD_STATE = threading.local()
+
+_USER_COLUMNS_SQL = """
+    email TEXT PRIMARY KEY,
+    first_name TEXT NOT NULL DEFAULT '',
+    last_name TEXT NOT NULL DEFAULT '',
+    branch TEXT NOT NULL DEFAULT 'Home Office' CHECK (TRIM(branch) <> ''),
+    is_active INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    last_seen_at TEXT
+"""
+_CREATE_CURRENT_EMAILS_SQL = "CREATE TEMP TABLE IF NOT EXISTS current_emails (email TEXT PRIMARY KEY)"
+_CLEAR_CURRENT_EMAILS_SQL = "DELETE FROM temp.current_emails"
+_INSERT_CURRENT_EMAIL_SQL = "INSERT OR IGNORE INTO temp.current_emails (email) VALUES (?)"
+
+
+@dataclass(slots=True)
+class DirectoryUser:
+    email: str
+    first_name: str
+    last_name: str
+    branch: str
+    is_active: bool
+    created_at: str
+    updated_at: str
+    last_seen_at: str | None
+
+
+UserT = TypeVar("UserT", bound=DirectoryUser)
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+
+def create_users_table_sql(table: str, *, if_not_exists: bool = False) -> str:
+    guard = "IF NOT EXISTS " if if_not_exists else ""
+    return f"CREATE TABLE {guard}{table} ({_USER_COLUMNS_SQL})"
+
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    # Connections are cached per thread so SQLite keeps its page cache between calls.
+    # Callers still use ``with store.connect() as conn`` for commit/rollback; that does not close it.
+    connections: dict[Path, sqlite3.Connection] | None = getattr(_THREAD_STATE, "connections", None)
+    if connections is None:
+        connections = {}
+        _THREAD_STATE.connections = connections
+    cached = connections.get(db_path)
+    if cached is not None:
+        return cached
+
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    # journal_mode is persisted in the database file, so it only needs setting once per process.
+    if db_path not in _WAL_ENABLED_PATHS:
+        conn.execute("PRAGMA journal_mode=WAL")
+        _WAL_ENABLED_PATHS.add(db_path)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-64000")
+    conn.execute("PRAGMA mmap_size=268435456")
+    connections[db_path] = conn
+    return conn
+
+
+class DirectoryStore(Generic[UserT]):
+    def __init__(
+        self,
+        *,
+        table: str,
+        user_cls: type[UserT],
+        db_path: Callable[[], Path],
+        migrate: Callable[[sqlite3.Connection], None] | None = None,
+    ) -> None:
+        # db_path is a callable so tests can repoint the vendor module's *_DIRECTORY_DB constant.
+        self.table = table
+        self.user_cls = user_cls
+        self._db_path = db_path
+        self._migrate = migrate
+        self._initialized_paths: set[Path] = set()
+        # Connections are per thread, so two requests can reach init on a fresh database at once.
+        self._init_lock = threading.Lock()
+
+        self._create_table_sql = create_users_table_sql(table, if_not_exists=True)
+        self._create_active_index_sql = (
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_active_email ON {table} (is_active, email)"
+        )
+        self._table_exists_sql = f"SELECT 1 FROM sqlite_master WHERE type='table' AND name='{table}'"
+        self._backfill_branch_sql = (
+            f"UPDATE {table} SET branch = 'Home Office' WHERE TRIM(COALESCE(branch, '')) = ''"
+        )
+        self._select_users_sql = f"""
+            SELECT email, first_name, last_name, branch, is_active, created_at, updated_at, last_seen_at
+            FROM {table}
+        """
+        self._select_active_users_sql = self._select_users_sql + " WHERE is_active = 1"
+        self._select_missing_users_sql = self._select_active_users_sql + """
+              AND email NOT IN (SELECT email FROM temp.current_emails)
+            ORDER BY email
+        """
+        # Full-row rewrites (and updated_at) are skipped unless a name, branch or the active flag
+        # changed. last_seen_at is left out of that test because every sync advances it; it goes
+        # through _mark_seen_sql instead, which only touches that one column.
+        self._upsert_user_sql = f"""
+            INSERT INTO {table} (
+                email, first_name, last_name, branch, is_active, created_at, updated_at, last_seen_at
+            )
+            VALUES (?1, ?2, ?3, ?4, 1, ?5, ?5, ?6)
+            ON CONFLICT(email) DO UPDATE SET
+                first_name=excluded.first_name,
+                last_name=excluded.last_name,
+                branch=excluded.branch,
+                is_active=1,
+                updated_at=excluded.updated_at
+            WHERE first_name IS NOT excluded.first_name
+               OR last_name IS NOT excluded.last_name
+               OR branch IS NOT excluded.branch
+               OR is_active <> 1
+        """
+        self._touch_user_sql = f"""
+            UPDATE {table}
+            SET
+                first_name=CASE WHEN ?1 <> '' THEN ?1 ELSE first_name END,
+                last_name=CASE WHEN ?2 <> '' THEN ?2 ELSE last_name END,
+                is_active=1,
+                updated_at=?3,
+                last_seen_at=?3
+            WHERE email=?4
+              AND (
+                  (?1 <> '' AND first_name IS NOT ?1)
+                  OR (?2 <> '' AND last_name IS NOT ?2)
+                  OR is_active <> 1
+              )
+        """
+        # ISO-8601 UTC strings compare in time order, so utc_now() stamps only ever move last_seen_at forward.
+        self._mark_seen_sql = f"""
+            UPDATE {table}
+            SET last_seen_at=?1
+            WHERE email=?2 AND (last_seen_at IS NULL OR last_seen_at < ?1)
+        """
+        # An explicit last_seen_at from the caller is stored as given, even if it is older.
+        self._set_seen_sql = f"""
+            UPDATE {table}
+            SET last_seen_at=?1
+            WHERE email=?2 AND last_seen_at IS NOT ?1
+        """
+
+    def connect(self) -> sqlite3.Connection:
+        return connect(self._db_path())
+
+    def init(self) -> None:
+        db_path = self._db_path()
+        if db_path in self._initialized_paths:
+            return
+
+        with self._init_lock:
+            if db_path in self._initialized_paths:
+                return
+            with connect(db_path) as conn:
+                exists = conn.execute(self._table_exists_sql).fetchone()
+                if not exists:
+                    conn.execute(self._create_table_sql)
+                else:
+                    if self._migrate is not None:
+                        self._migrate(conn)
+                    # Tables created before the branch CHECK constraint may still hold blank branches.
+                    conn.execute(self._backfill_branch_sql)
+                conn.execute(self._create_active_index_sql)
+                conn.commit()
+            self._initialized_paths.add(db_path)
+
+    def reset_init_state(self) -> None:
+        self._initialized_paths.clear()
+
+    def _user_from_row(self, row: tuple) -> UserT:
+        # Positional args follow the SELECT column order, which matches the dataclass field order.
+        return self.user_cls(
+            (row[0] or "").strip().lower(),
+            row[1] or "",
+            row[2] or "",
+            row[3] or "",
+            bool(row[4]),
+            row[5] or "",
+            row[6] or "",
+            row[7],
+        )
+
+    def list_users(self, *, active_only: bool = False) -> dict[str, UserT]:
+        self.init()
+        with self.connect() as conn:
+            rows = conn.execute(self._select_active_users_sql if active_only else self._select_users_sql).fetchall()
+
+        users: dict[str, UserT] = {}
+        for row in rows:
+            user = self._user_from_row(row)
+            if user.email:
+                users[user.email] = user
+        return users
+
+    def upsert_users(
+        self,
+        users: list[dict[str, str]],
+        *,
+        last_seen_at: str | None = None,
+        mark_seen: bool = True,
+    ) -> None:
+        if not users:
+            return
+
+        self.init()
+        now = utc_now()
+        # With mark_seen=False existing rows keep their last_seen_at and new rows start unseen.
+        seen = (last_seen_at or now) if mark_seen else None
+        # Keyed by email so duplicate input rows collapse to one write (last one wins).
+        # Every tuple shares the same ``now``/``seen`` strings; numbered parameters bind each once.
+        rows: dict[str, tuple[str, str, str, str, str, str | None]] = {}
+        for user in users:
+            email = (user.get("email") or "").strip().lower()
+            if not email:
+                continue
+            first_name = (user.get("first_name") or "").strip()
+            last_name = (user.get("last_name") or "").strip()
+            branch = (user.get("branch") or "").strip()
+            if not branch:
+                continue
+            rows[email] = (email, first_name, last_name, branch, now, seen)
+        if not rows:
+            return
+
+        with self.connect() as conn:
+            # Take the write lock up front so the batch never has to upgrade a shared lock mid-transaction.
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(self._upsert_user_sql, rows.values())
+            if seen is not None:
+                seen_sql = self._mark_seen_sql if last_seen_at is None else self._set_seen_sql
+                conn.executemany(seen_sql, [(seen, email) for email in rows])
+            conn.commit()
+
+    def touch_seen_users(self, users: list[dict[str, str]]) -> None:
+        if not users:
+            return
+
+        self.init()
+        now = utc_now()
+        rows: dict[str, tuple[str, str, str, str]] = {}
+        for user in users:
+            email = (user.get("email") or "").strip().lower()
+            if not email:
+                continue
+            first_name = (user.get("first_name") or "").strip()
+            last_name = (user.get("last_name") or "").strip()
+            rows[email] = (first_name, last_name, now, email)
+        if not rows:
+            return
+
+        with self.connect() as conn:
+            # Take the write lock up front so the batch never has to upgrade a shared lock mid-transaction.
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(self._touch_user_sql, rows.values())
+            conn.executemany(self._mark_seen_sql, [(now, email) for email in rows])
+            conn.commit()
+
+    def find_missing_users(self, current_emails: Iterable[str]) -> list[UserT]:
+        self.init()
+        normalized = {email.strip().lower() for email in current_emails if email.strip()}
+
+        with self.connect() as conn:
+            # Stage current emails in a temp table so large exports avoid SQLite's bound-parameter cap.
+            conn.execute(_CREATE_CURRENT_EMAILS_SQL)
+            conn.execute(_CLEAR_CURRENT_EMAILS_SQL)
+            conn.executemany(_INSERT_CURRENT_EMAIL_SQL, [(email,) for email in normalized])
+            rows = conn.execute(self._select_missing_users_sql).fetchall()
+            conn.commit()
+
+        return [self._user_from_row(row) for row in rows]
+
+    def deactivate_users(self, emails: list[str]) -> int:
+        if not emails:
+            return 0
+
+        self.init()
+        now = utc_now()
+        normalized = sorted({(email or "").strip().lower() for email in emails if (email or "").strip()})
+        if not normalized:
+            return 0
+
+        placeholders = ",".join("?" for _ in normalized)
+        with self.connect() as conn:
+            result = conn.execute(
+                f"""
+                UPDATE {self.table}
+                SET is_active = 0, updated_at = ?
+                WHERE LOWER(TRIM(email)) IN ({placeholders})
+                """,
+                (now, *normalized),
+            )
+            conn.commit()
+            return int(result.rowcount or 0)
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+import base64
+import http.client
 import json
 import os
-import urllib.error
+import queue
+import sys
+import threading
 import urllib.parse
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any
+from itertools import chain
+from typing import Any, Callable, Iterator
 
 from .processing import (
     INTEGRICOM_LICENSE_BP,
@@ -20,6 +26,13 @@ from .processing import (
 
 GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
 GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+GRAPH_REQUEST_TIMEOUT_SECONDS = 30
+WRITEBACK_QUEUE_SIZE = 4
+
+_HTTP_STATE = threading.local()
+# One long-lived worker for the SKU listing, so its thread-local keep-alive Graph connection survives
+# between syncs instead of paying a fresh TLS handshake on a new thread each time.
+_SKU_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="entra-sku")
 
 SKU_PART_TO_INTEGRICOM_LICENSE: dict[str, str] = {
     # Microsoft 365 Business Premium variants
@@ -43,6 +56,10 @@ class EntraSyncError(RuntimeError):
     pass
 
 
+class EntraWritebackError(EntraSyncError):
+    pass
+
+
 @dataclass
 class EntraIntegricomSyncResult:
     users: list[dict[str, str]]
@@ -83,6 +100,51 @@ def _read_required_env() -> tuple[str, str, str]:
     return tenant_id, client_id, client_secret
 
 
+def _open_https_connection(host: str) -> http.client.HTTPSConnection:
+    # Honor HTTPS_PROXY/NO_PROXY the way urlopen did by tunnelling through the proxy with CONNECT.
+    proxy = urllib.request.getproxies().get("https")
+    if not proxy or urllib.request.proxy_bypass(urllib.parse.urlsplit(f"//{host}").hostname or host):
+        return http.client.HTTPSConnection(host, timeout=GRAPH_REQUEST_TIMEOUT_SECONDS)
+
+    proxy_parts = urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    if not proxy_parts.hostname:
+        raise EntraSyncError(f"Unsupported HTTPS proxy: {proxy}")
+    tunnel_headers: dict[str, str] = {}
+    if proxy_parts.username:
+        username = urllib.parse.unquote(proxy_parts.username)
+        password = urllib.parse.unquote(proxy_parts.password or "")
+        token = base64.b64encode(f"{username}:{password}".encode("utf-8")).decode("ascii")
+        tunnel_headers["Proxy-Authorization"] = f"Basic {token}"
+    conn = http.client.HTTPSConnection(
+        proxy_parts.hostname,
+        proxy_parts.port or 80,
+        timeout=GRAPH_REQUEST_TIMEOUT_SECONDS,
+    )
+    conn.set_tunnel(host, headers=tunnel_headers)
+    return conn
+
+
+def _https_connection(host: str) -> http.client.HTTPSConnection:
+    # Keep one HTTPS connection per host per thread: token requests reuse the login host's connection and
+    # Graph pages reuse the graph host's connection.
+    connections: dict[str, http.client.HTTPSConnection] | None = getattr(_HTTP_STATE, "connections", None)
+    if connections is None:
+        connections = {}
+        _HTTP_STATE.connections = connections
+    conn = connections.get(host)
+    if conn is None:
+        conn = _open_https_connection(host)
+        connections[host] = conn
+    return conn
+
+
+def _drop_https_connection(host: str) -> None:
+    connections: dict[str, http.client.HTTPSConnection] = getattr(_HTTP_STATE, "connections", {})
+    conn = connections.pop(host, None)
+    if conn is not None:
+        conn.close()
+
+
 def _json_request(
     method: str,
     url: str,
@@ -90,21 +152,42 @@ def _json_request(
     headers: dict[str, str] | None = None,
     body: bytes | None = None,
 ) -> dict[str, Any]:
-    request = urllib.request.Request(url=url, method=method, headers=headers or {}, data=body)
-    try:
-        with urllib.request.urlopen(request, timeout=30) as response:
-            payload = response.read().decode("utf-8")
-    except urllib.error.HTTPError as exc:
-        details = exc.read().decode("utf-8", errors="replace")
-        raise EntraSyncError(f"Graph request failed ({exc.code}): {details}") from exc
-    except urllib.error.URLError as exc:
-        raise EntraSyncError(f"Graph request error: {exc.reason}") from exc
-    except Exception as exc:  # pragma: no cover - unexpected transport issues
-        raise EntraSyncError(f"Unexpected Graph request error: {exc}") from exc
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme != "https" or not parts.netloc:
+        raise EntraSyncError(f"Unsupported Graph URL: {url}")
+    host = parts.netloc
+    target = f"{parts.path or '/'}?{parts.query}" if parts.query else (parts.path or "/")
+
+    for attempt in range(2):
+        conn = _https_connection(host)
+        try:
+            conn.request(method, target, body=body, headers=headers or {})
+            response = conn.getresponse()
+            payload = response.read()
+        except ConnectionError as exc:
+            # The server may have closed an idle keep-alive connection; reconnect once.
+            _drop_https_connection(host)
+            if attempt == 0:
+                continue
+            raise EntraSyncError(f"Graph request error: {exc}") from exc
+        except (OSError, http.client.HTTPException) as exc:
+            _drop_https_connection(host)
+            raise EntraSyncError(f"Graph request error: {exc}") from exc
+        except Exception as exc:  # pragma: no cover - unexpected transport issues
+            _drop_https_connection(host)
+            raise EntraSyncError(f"Unexpected Graph request error: {exc}") from exc
+        break
+
+    if response.will_close:
+        _drop_https_connection(host)
+    if response.status >= 400:
+        details = payload.decode("utf-8", errors="replace")
+        raise EntraSyncError(f"Graph request failed ({response.status}): {details}")
 
     try:
+        # json.loads accepts bytes directly, which skips an intermediate decoded copy of each page.
         return json.loads(payload)
-    except json.JSONDecodeError as exc:
+    except ValueError as exc:
         raise EntraSyncError("Graph response was not valid JSON.") from exc
 
 
@@ -131,8 +214,7 @@ def _acquire_graph_access_token() -> str:
     return token
 
 
-def _graph_get_paginated(url: str, access_token: str) -> list[dict[str, Any]]:
-    rows: list[dict[str, Any]] = []
+def _graph_iter_pages(url: str, access_token: str) -> Iterator[list[dict[str, Any]]]:
     current_url: str | None = url
     while current_url:
         payload = _json_request(
@@ -142,16 +224,15 @@ def _graph_get_paginated(url: str, access_token: str) -> list[dict[str, Any]]:
         )
         values = payload.get("value")
         if isinstance(values, list):
-            rows.extend([item for item in values if isinstance(item, dict)])
+            yield [item for item in values if isinstance(item, dict)]
         next_link = payload.get("@odata.nextLink")
         current_url = next_link if isinstance(next_link, str) and next_link else None
-    return rows
 
 
 def _get_subscribed_sku_map(access_token: str) -> dict[str, str]:
-    rows = _graph_get_paginated(f"{GRAPH_BASE_URL}/subscribedSkus?$select=skuId,skuPartNumber", access_token)
+    pages = _graph_iter_pages(f"{GRAPH_BASE_URL}/subscribedSkus?$select=skuId,skuPartNumber", access_token)
     mapping: dict[str, str] = {}
-    for row in rows:
+    for row in chain.from_iterable(pages):
         sku_id = str(row.get("skuId") or "").strip().lower()
         sku_part = str(row.get("skuPartNumber") or "").strip()
         if sku_id and sku_part:
@@ -159,15 +240,64 @@ def _get_subscribed_sku_map(access_token: str) -> dict[str, str]:
     return mapping
 
 
-def sync_integricom_users_from_entra() -> EntraIntegricomSyncResult:
+class _BatchWriter:
+    # Runs the caller's writeback on its own thread so disk writes overlap the next Graph page fetch.
+    # The writer thread gets its own SQLite connection through the per-thread connection cache.
+    def __init__(self, on_batch: Callable[[list[dict[str, str]]], None]) -> None:
+        self._on_batch = on_batch
+        self._queue: queue.Queue[list[dict[str, str]] | None] = queue.Queue(maxsize=WRITEBACK_QUEUE_SIZE)
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(target=self._run, name="entra-writeback", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            if self._error is not None:
+                # Keep draining so the producer never blocks on a full queue after a failure.
+                continue
+            try:
+                self._on_batch(batch)
+            except BaseException as exc:
+                self._error = exc
+
+    def put(self, batch: list[dict[str, str]]) -> None:
+        self.raise_if_failed()
+        self._queue.put(batch)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise EntraWritebackError(f"Directory writeback failed: {self._error}") from self._error
+
+
+def sync_integricom_users_from_entra(
+    *,
+    on_batch: Callable[[list[dict[str, str]]], None] | None = None,
+) -> EntraIntegricomSyncResult:
     access_token = _acquire_graph_access_token()
-    sku_id_to_part = _get_subscribed_sku_map(access_token)
     users_url = (
         f"{GRAPH_BASE_URL}/users"
         "?$select=givenName,surname,userPrincipalName,mail,officeLocation,department,assignedLicenses"
         "&$top=999"
     )
-    graph_users = _graph_get_paginated(users_url, access_token)
+    user_pages = _graph_iter_pages(users_url, access_token)
+    # nextLink pages must be walked in order, but the SKU and user listings are independent chains:
+    # fetch the first users page while the SKU listing is in flight, then stream the rest.
+    sku_future = _SKU_EXECUTOR.submit(_get_subscribed_sku_map, access_token)
+    first_user_page = next(user_pages, [])
+    sku_id_to_part = sku_future.result()
+    # Resolve each tenant SKU once so the per-user loop is a single dict lookup per assigned license.
+    sku_id_to_canonical: dict[str, str] = {}
+    for sku_id, sku_part in sku_id_to_part.items():
+        canonical = _canonical_integricom_license_from_sku_part(sku_part)
+        if canonical:
+            sku_id_to_canonical[sku_id] = canonical
 
     rows_to_upsert: list[dict[str, str]] = []
     export_users: list[EntraIntegricomExportUser] = []
@@ -178,61 +308,78 @@ def sync_integricom_users_from_entra() -> EntraIntegricomSyncResult:
     unknown_sku_parts: set[str] = set()
     warnings: list[str] = []
 
-    for user in graph_users:
-        users_scanned += 1
-        email = str(user.get("userPrincipalName") or user.get("mail") or "").strip().lower()
-        if not email:
-            skipped_unlicensed += 1
-            continue
-        if "#ext#" in email:
-            skipped_external += 1
-            continue
-
-        assigned = user.get("assignedLicenses")
-        if not isinstance(assigned, list) or not assigned:
-            skipped_unlicensed += 1
-            continue
-
-        canonical_licenses: set[str] = set()
-        for entry in assigned:
-            if not isinstance(entry, dict):
-                continue
-            sku_id = str(entry.get("skuId") or "").strip().lower()
-            if not sku_id:
-                continue
-            sku_part = sku_id_to_part.get(sku_id, "")
-            canonical = _canonical_integricom_license_from_sku_part(sku_part)
-            if canonical:
-                canonical_licenses.add(canonical)
-            elif sku_part:
-                unknown_sku_parts.add(sku_part)
-
-        if not canonical_licenses:
-            skipped_unlicensed += 1
-            continue
-
-        supported_users += 1
-        office = str(user.get("officeLocation") or "").strip()
-        department = str(user.get("department") or "").strip()
-        branch = _normalize_integricom_branch(office, department)
-        rows_to_upsert.append(
-            {
-                "email": email,
-                "first_name": str(user.get("givenName") or "").strip(),
-                "last_name": str(user.get("surname") or "").strip(),
-                "branch": branch,
-            }
-        )
-        export_users.append(
-            EntraIntegricomExportUser(
-                email=email,
-                first_name=str(user.get("givenName") or "").strip(),
-                last_name=str(user.get("surname") or "").strip(),
-                office=office,
-                default_branch=branch,
-                licenses=sorted(canonical_licenses),
-            )
-        )
+    writer = _BatchWriter(on_batch) if on_batch is not None else None
+    try:
+        for page in chain((first_user_page,), user_pages):
+            page_rows: list[dict[str, str]] = []
+            for user in page:
+                users_scanned += 1
+                raw = str(user.get("userPrincipalName") or user.get("mail") or "")
+                # Reject guests on the raw address so only surviving users pay for the lower-cased copy.
+                if "#EXT#" in raw or "#ext#" in raw:
+                    skipped_external += 1
+                    continue
+                email = raw.strip().lower()
+                if not email:
+                    skipped_unlicensed += 1
+                    continue
+
+                assigned = user.get("assignedLicenses")
+                if not isinstance(assigned, list) or not assigned:
+                    skipped_unlicensed += 1
+                    continue
+
+                canonical_licenses: set[str] = set()
+                for entry in assigned:
+                    if not isinstance(entry, dict):
+                        continue
+                    sku_id = str(entry.get("skuId") or "").strip().lower()
+                    if not sku_id:
+                        continue
+                    canonical = sku_id_to_canonical.get(sku_id)
+                    if canonical:
+                        canonical_licenses.add(canonical)
+                        continue
+                    sku_part = sku_id_to_part.get(sku_id)
+                    if sku_part:
+                        unknown_sku_parts.add(sku_part)
+
+                if not canonical_licenses:
+                    skipped_unlicensed += 1
+                    continue
+
+                supported_users += 1
+                office = str(user.get("officeLocation") or "").strip()
+                department = str(user.get("department") or "").strip()
+                # Offices repeat across thousands of users; interning shares one string per branch name.
+                branch = sys.intern(_normalize_integricom_branch(office, department))
+                page_rows.append(
+                    {
+                        "email": email,
+                        "first_name": str(user.get("givenName") or "").strip(),
+                        "last_name": str(user.get("surname") or "").strip(),
+                        "branch": branch,
+                    }
+                )
+                export_users.append(
+                    EntraIntegricomExportUser(
+                        email=email,
+                        first_name=str(user.get("givenName") or "").strip(),
+                        last_name=str(user.get("surname") or "").strip(),
+                        office=office,
+                        default_branch=branch,
+                        licenses=sorted(canonical_licenses),
+                    )
+                )
+
+            rows_to_upsert.extend(page_rows)
+            if writer is not None and page_rows:
+                writer.put(page_rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        writer.raise_if_failed()
 
     if unknown_sku_parts:
         warnings.append(
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
+import asyncio
+import functools
+import io
 import json
+import sqlite3
 from decimal import Decimal
 from pathlib import Path
-from typing import Any
+from typing import Any, Awaitable, BinaryIO, Callable, Iterable
 
 from fastapi import Body, FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 
 from .adobe_directory import (
@@ -26,7 +31,7 @@ from .integricom_directory import (
     touch_seen_integricom_users,
     upsert_integricom_users,
 )
-from .entra_graph import EntraSyncError, sync_integricom_users_from_entra
+from .entra_graph import EntraSyncError, EntraWritebackError, sync_integricom_users_from_entra
 from .processing import (
     ADOBE_ADJUSTMENT_LICENSE,
     ADOBE_HOME_OFFICE,
@@ -40,7 +45,7 @@ from .processing import (
     build_adobe_user_allocations,
     build_integricom_support_allocations,
     build_integricom_user_allocations,
-    build_breakdown,
+    build_breakdown_with_total,
     parse_adobe_export_csv,
     parse_adobe_invoice,
     parse_integricom_export_csv,
@@ -55,24 +60,69 @@ from .spreadsheet_import import parse_adobe_directory_import_file
 
 BASE_DIR = Path(__file__).resolve().parent
 STATIC_DIR = BASE_DIR / "static"
+_ANALYZE_VENDOR_TYPES = frozenset({"generic", "hexnode", "adobe", "integricom", "integricom_support"})
+_CENT = Decimal("0.01")
+_ZERO = Decimal("0")
 
 app = FastAPI(title="Russell Toolkit", version="0.3.0")
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Explicit lists let preflights be answered from precomputed headers instead of echoing the request.
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
 )
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 
+def _json_default(value: Any) -> Any:
+    # Matches FastAPI's Decimal encoding for the few Decimal values that reach a response.
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class _PlainJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return json.dumps(
+            content,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+            default=_json_default,
+        ).encode("utf-8")
+
+
+_DictEndpoint = Callable[..., Awaitable[dict[str, Any]]]
+
+
+def _direct_json_endpoint(endpoint: _DictEndpoint) -> Callable[..., Awaitable[Response]]:
+    # Returning a Response makes FastAPI skip response-model validation and jsonable_encoder,
+    # which walk every row of large analyze payloads. The wrapped function still returns a dict.
+    @functools.wraps(endpoint)
+    async def wrapper(*args: Any, **kwargs: Any) -> Response:
+        return _PlainJSONResponse(await endpoint(*args, **kwargs))
+
+    return wrapper
+
+
+def _post_prerendered_json(path: str) -> Callable[[_DictEndpoint], _DictEndpoint]:
+    # Registers the Response-returning wrapper as the POST route but hands back the original handler,
+    # so the route is declared at the handler and direct callers still get a dict.
+    def register(endpoint: _DictEndpoint) -> _DictEndpoint:
+        app.post(path, response_class=_PlainJSONResponse)(_direct_json_endpoint(endpoint))
+        return endpoint
+
+    return register
+
+
 def _append_integricom_reconciliation_row(
     non_user_rows: list[dict[str, Any]],
     *,
     adjustment: Decimal,
 ) -> list[dict[str, Any]]:
-    if adjustment == Decimal("0.00"):
+    if adjustment == _ZERO:
         return non_user_rows
 
     updated_rows = [dict(row) for row in non_user_rows]
@@ -81,7 +131,7 @@ def _append_integricom_reconciliation_row(
             "branch": INTEGRICOM_HOME_OFFICE,
             "license": INTEGRICOM_ADJUSTMENT_LICENSE,
             "allocation_type": "Invoice Reconciliation",
-            "total_amount": float(adjustment.quantize(Decimal("0.01"))),
+            "total_amount": float(adjustment.quantize(_CENT)),
         }
     )
     updated_rows.sort(key=lambda row: (row.get("branch", ""), row.get("license", ""), row.get("allocation_type", "")))
@@ -94,7 +144,7 @@ def _append_integricom_credit_row(
     *,
     credits_total: Decimal,
 ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
-    if credits_total == Decimal("0.00"):
+    if credits_total == _ZERO:
         return line_rows, non_user_rows
 
     credit_row = {
@@ -110,7 +160,7 @@ def _append_integricom_credit_row(
             "branch": INTEGRICOM_HOME_OFFICE,
             "license": INTEGRICOM_CREDIT_LICENSE,
             "allocation_type": "Invoice Credit",
-            "total_amount": float(credits_total.quantize(Decimal("0.01"))),
+            "total_amount": float(credits_total.quantize(_CENT)),
         },
     ]
     updated_non_user_rows.sort(
@@ -141,7 +191,7 @@ def health() -> dict[str, str]:
 
 @app.post("/api/adobe/users/save")
 def save_adobe_users(payload: list[dict[str, Any]] = Body(...)) -> dict[str, Any]:
-    parsed = _parse_user_updates(json.dumps(payload), field_name="adobe_user_updates")
+    parsed = _validate_user_updates(payload, field_name="adobe_user_updates")
     rows_to_upsert = [
         {
             "email": item["email"],
@@ -191,7 +241,7 @@ async def import_adobe_users(mapping_file: UploadFile = File(...)) -> dict[str,
     if not raw:
         raise HTTPException(status_code=400, detail="The uploaded spreadsheet is empty.")
 
-    parsed = parse_adobe_directory_import_file(mapping_file.filename, raw)
+    parsed = await run_in_threadpool(parse_adobe_directory_import_file, mapping_file.filename, raw)
     if not parsed.rows:
         raise HTTPException(status_code=400, detail=" | ".join(parsed.warnings) or "No importable users found.")
 
@@ -208,7 +258,7 @@ async def import_adobe_users(mapping_file: UploadFile = File(...)) -> dict[str,
 
 @app.post("/api/integricom/users/save")
 def save_integricom_users(payload: list[dict[str, Any]] = Body(...)) -> dict[str, Any]:
-    parsed = _parse_user_updates(json.dumps(payload), field_name="integricom_user_updates")
+    parsed = _validate_user_updates(payload, field_name="integricom_user_updates")
     rows_to_upsert = [
         {
             "email": item["email"],
@@ -249,15 +299,23 @@ def deactivate_integricom_users(payload: dict[str, Any] = Body(...)) -> dict[str
     }
 
 
+def _write_back_integricom_page(users: list[dict[str, str]]) -> None:
+    upsert_integricom_users(users, mark_seen=False)
+
+
 @app.post("/api/integricom/sync/entra")
 def sync_integricom_users_from_entra_endpoint() -> dict[str, Any]:
+    # Each Graph page is written back on a worker thread while the next page is fetched, so a failed
+    # sync can leave the pages read so far saved; last_seen_at only advances once the listing succeeds.
     try:
-        result = sync_integricom_users_from_entra()
+        result = sync_integricom_users_from_entra(on_batch=_write_back_integricom_page)
+        touch_seen_integricom_users(result.users)
+    except EntraWritebackError as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
     except EntraSyncError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
-
-    upsert_integricom_users(result.users)
-    touch_seen_integricom_users(result.users)
+    except sqlite3.Error as exc:
+        raise HTTPException(status_code=500, detail=f"Directory writeback failed: {exc}") from exc
 
     return {
         "synced": len(result.users),
@@ -270,10 +328,7 @@ def sync_integricom_users_from_entra_endpoint() -> dict[str, Any]:
     }
 
 
-def _parse_user_updates(raw: str | None, *, field_name: str) -> list[dict[str, str]]:
-    if not raw:
-        return []
-
+def _load_json_array(raw: str | bytes, *, field_name: str) -> list[Any]:
     try:
         payload = json.loads(raw)
     except json.JSONDecodeError as exc:
@@ -281,7 +336,17 @@ def _parse_user_updates(raw: str | None, *, field_name: str) -> list[dict[str, s
 
     if not isinstance(payload, list):
         raise HTTPException(status_code=400, detail=f"{field_name} must be a JSON array.")
+    return payload
+
+
+def _parse_user_updates(raw: str | bytes | None, *, field_name: str) -> list[dict[str, str]]:
+    if not raw:
+        return []
+
+    return _validate_user_updates(_load_json_array(raw, field_name=field_name), field_name=field_name)
 
+
+def _validate_user_updates(payload: list[Any], *, field_name: str) -> list[dict[str, str]]:
     parsed: list[dict[str, str]] = []
     for index, item in enumerate(payload, start=1):
         if not isinstance(item, dict):
@@ -318,17 +383,11 @@ def _parse_email_list(payload: dict[str, Any], *, field_name: str) -> list[str]:
     return parsed
 
 
-def _parse_integricom_branch_item_updates(raw: str | None) -> list[dict[str, Any]]:
+def _parse_integricom_branch_item_updates(raw: str | bytes | None) -> list[dict[str, Any]]:
     if not raw:
         return []
 
-    try:
-        payload = json.loads(raw)
-    except json.JSONDecodeError as exc:
-        raise HTTPException(status_code=400, detail=f"Invalid integricom_branch_item_updates JSON: {exc}") from exc
-
-    if not isinstance(payload, list):
-        raise HTTPException(status_code=400, detail="integricom_branch_item_updates must be a JSON array.")
+    payload = _load_json_array(raw, field_name="integricom_branch_item_updates")
 
     parsed: list[dict[str, Any]] = []
     for index, item in enumerate(payload, start=1):
@@ -366,17 +425,11 @@ def _parse_integricom_branch_item_updates(raw: str | None) -> list[dict[str, Any
     return parsed
 
 
-def _parse_integricom_support_updates(raw: str | None) -> list[dict[str, str]]:
+def _parse_integricom_support_updates(raw: str | bytes | None) -> list[dict[str, str]]:
     if not raw:
         return []
 
-    try:
-        payload = json.loads(raw)
-    except json.JSONDecodeError as exc:
-        raise HTTPException(status_code=400, detail=f"Invalid integricom_support_updates JSON: {exc}") from exc
-
-    if not isinstance(payload, list):
-        raise HTTPException(status_code=400, detail="integricom_support_updates must be a JSON array.")
+    payload = _load_json_array(raw, field_name="integricom_support_updates")
 
     parsed: list[dict[str, str]] = []
     for index, item in enumerate(payload, start=1):
@@ -400,14 +453,10 @@ def _parse_integricom_support_updates(raw: str | None) -> list[dict[str, str]]:
 
 
 def _directory_to_profile_map(directory: dict[str, Any]) -> dict[str, dict[str, str]]:
-    profiles: dict[str, dict[str, str]] = {}
-    for email, user in directory.items():
-        profiles[email] = {
-            "branch": user.branch,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-        }
-    return profiles
+    return {
+        email: {"branch": user.branch, "first_name": user.first_name, "last_name": user.last_name}
+        for email, user in directory.items()
+    }
 
 
 def _serialize_directory_users(directory: dict[str, Any]) -> list[dict[str, Any]]:
@@ -428,8 +477,10 @@ def _serialize_directory_users(directory: dict[str, Any]) -> list[dict[str, Any]
     return rows
 
 
-def _serialize_missing_adobe_users(current_emails: set[str]) -> list[dict[str, Any]]:
-    missing = find_missing_users(current_emails)
+def _serialize_missing_users(
+    find_missing: Callable[[Iterable[str]], list[Any]],
+    current_emails: Iterable[str],
+) -> list[dict[str, Any]]:
     return [
         {
             "email": user.email,
@@ -438,52 +489,57 @@ def _serialize_missing_adobe_users(current_emails: set[str]) -> list[dict[str, A
             "branch": user.branch,
             "last_seen_at": user.last_seen_at,
         }
-        for user in missing
+        for user in find_missing(current_emails)
     ]
 
 
-def _serialize_missing_integricom_users(current_emails: set[str]) -> list[dict[str, Any]]:
-    missing = find_missing_integricom_users(current_emails)
-    return [
-        {
-            "email": user.email,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "branch": user.branch,
-            "last_seen_at": user.last_seen_at,
-        }
-        for user in missing
-    ]
+async def _upload_stream(upload: UploadFile) -> tuple[BinaryIO, int]:
+    # Hand parsers the spooled file itself instead of a bytes copy; size comes from the
+    # multipart parser when available, otherwise from the end offset.
+    size = upload.size
+    if size is None:
+        size = upload.file.seek(0, io.SEEK_END)
+    await upload.seek(0)
+    return upload.file, size
 
 
-async def _analyze_adobe(
-    csv_files: list[UploadFile],
-    invoice_file: UploadFile | None,
-    adobe_user_updates: str | None,
-) -> dict[str, Any]:
-    if invoice_file is None or not invoice_file.filename:
-        raise HTTPException(status_code=400, detail="Adobe mode requires an invoice PDF upload.")
+async def _read_uploads(uploads: list[UploadFile]) -> list[tuple[UploadFile, bytes]]:
+    named = [upload for upload in uploads if upload.filename]
+    # Uploads the multipart parser already sized at zero bytes are not read at all.
+    raws = await asyncio.gather(*(_read_upload(upload) for upload in named))
+    return list(zip(named, raws))
 
-    warnings: list[str] = []
-    file_summaries: list[dict[str, Any]] = []
 
-    invoice_raw = await invoice_file.read()
-    parsed_invoice = parse_adobe_invoice(invoice_file.filename, invoice_raw)
-    warnings.extend(parsed_invoice.warnings)
-    if not parsed_invoice.per_license_cost:
-        raise HTTPException(status_code=400, detail="Could not parse Adobe invoice line-item pricing.")
+async def _read_upload(upload: UploadFile) -> bytes:
+    if upload.size == 0:
+        return b""
+    return await upload.read()
 
-    export_users = []
-    for upload in csv_files:
-        if not upload.filename:
-            continue
 
-        raw = await upload.read()
-        if not raw:
+async def _parse_uploads(
+    csv_payloads: list[tuple[UploadFile, bytes]],
+    parse: Callable[[str, bytes], Any],
+) -> list[tuple[UploadFile, Any | None]]:
+    # Parse every non-empty upload concurrently in the threadpool; results keep upload order and
+    # empty uploads map to None so callers can still warn about them in place.
+    parsed = iter(
+        await asyncio.gather(*(run_in_threadpool(parse, upload.filename, raw) for upload, raw in csv_payloads if raw))
+    )
+    return [(upload, next(parsed) if raw else None) for upload, raw in csv_payloads]
+
+
+async def _ingest_export_uploads(
+    csv_payloads: list[tuple[UploadFile, bytes]],
+    parse_export: Callable[[str, bytes], Any],
+) -> tuple[list[Any], list[dict[str, Any]], list[str]]:
+    export_users: list[Any] = []
+    file_summaries: list[dict[str, Any]] = []
+    warnings: list[str] = []
+    for upload, parsed_export in await _parse_uploads(csv_payloads, parse_export):
+        if parsed_export is None:
             warnings.append(f"{upload.filename}: empty file skipped.")
             continue
 
-        parsed_export = parse_adobe_export_csv(upload.filename, raw)
         export_users.extend(parsed_export.users)
         file_summaries.append(
             {
@@ -493,6 +549,34 @@ async def _analyze_adobe(
             }
         )
         warnings.extend(parsed_export.warnings)
+    return export_users, file_summaries, warnings
+
+
+async def _analyze_adobe(
+    csv_files: list[UploadFile],
+    invoice_file: UploadFile | None,
+    adobe_user_updates: str | None,
+    *,
+    include_csv: bool = True,
+) -> dict[str, Any]:
+    if invoice_file is None or not invoice_file.filename:
+        raise HTTPException(status_code=400, detail="Adobe mode requires an invoice PDF upload.")
+
+    warnings: list[str] = []
+
+    # Spooled upload reads are independent, so the invoice and every CSV are read concurrently.
+    invoice_raw, csv_payloads = await asyncio.gather(invoice_file.read(), _read_uploads(csv_files))
+    # Parsing and allocation are CPU-bound; run them in the threadpool so the event loop keeps serving.
+    # The invoice PDF and the exports share no state, so they are parsed concurrently.
+    parsed_invoice, (export_users, file_summaries, upload_warnings) = await asyncio.gather(
+        run_in_threadpool(parse_adobe_invoice, invoice_file.filename, invoice_raw),
+        _ingest_export_uploads(csv_payloads, parse_adobe_export_csv),
+    )
+    warnings.extend(parsed_invoice.warnings)
+    if not parsed_invoice.per_license_cost:
+        raise HTTPException(status_code=400, detail="Could not parse Adobe invoice line-item pricing.")
+
+    warnings.extend(upload_warnings)
 
     init_adobe_directory()
     submitted_updates = _parse_user_updates(adobe_user_updates, field_name="adobe_user_updates")
@@ -512,16 +596,27 @@ async def _analyze_adobe(
 
     directory = list_adobe_users()
     directory_profiles = _directory_to_profile_map(directory)
+    # Shared by the enrichment and success responses.
+    invoice_meta = {
+        "filename": invoice_file.filename,
+        "size_bytes": len(invoice_raw),
+        "invoice_number": parsed_invoice.invoice_number,
+        "invoice_total": float(parsed_invoice.invoice_total) if parsed_invoice.invoice_total else None,
+        "parsed_licenses": sorted(parsed_invoice.per_license_cost),
+        "directory_users": len(directory),
+    }
 
-    all_rows, adobe_user_rows, allocation_warnings, unresolved_emails = build_adobe_user_allocations(
+    all_rows, adobe_user_rows, allocation_warnings, unresolved_emails = await run_in_threadpool(
+        build_adobe_user_allocations,
         export_users,
         directory_profiles,
         parsed_invoice.per_license_cost,
     )
     warnings.extend(allocation_warnings)
 
-    current_emails = {user.email for user in export_users if user.email}
-    missing_users = _serialize_missing_adobe_users(current_emails)
+    # The directory store normalizes and de-duplicates these itself, so no set is built here.
+    current_emails = (user.email for user in export_users if user.email)
+    missing_users = _serialize_missing_users(find_missing_users, current_emails)
 
     if unresolved_emails:
         unresolved_set = set(unresolved_emails)
@@ -540,14 +635,7 @@ async def _analyze_adobe(
             "summary": [],
             "totals": {"line_items": 0, "grand_total": 0.0},
             "reconciliation": None,
-            "invoice": {
-                "filename": invoice_file.filename,
-                "size_bytes": len(invoice_raw),
-                "invoice_number": parsed_invoice.invoice_number,
-                "invoice_total": float(parsed_invoice.invoice_total) if parsed_invoice.invoice_total else None,
-                "parsed_licenses": sorted(parsed_invoice.per_license_cost.keys()),
-                "directory_users": len(directory),
-            },
+            "invoice": invoice_meta,
             "warnings": warnings,
             "breakdown_csv": "",
         }
@@ -563,12 +651,13 @@ async def _analyze_adobe(
         ]
     )
 
-    summary = build_breakdown(all_rows)
-    base_total = sum(Decimal(str(item["total_amount"])) for item in summary)
+    summary, base_total = await run_in_threadpool(build_breakdown_with_total, all_rows)
+    grand_total_amount = base_total
 
     reconciliation = None
     if parsed_invoice.invoice_total is not None:
-        adjustment = (parsed_invoice.invoice_total - base_total).quantize(Decimal("0.01"))
+        adjustment = (parsed_invoice.invoice_total - base_total).quantize(_CENT)
+        grand_total_amount = base_total + adjustment
         summary = apply_home_office_adjustment(
             summary,
             adjustment,
@@ -576,13 +665,13 @@ async def _analyze_adobe(
             home_office_name=ADOBE_HOME_OFFICE,
         )
         reconciliation = {
-            "base_total": float(base_total.quantize(Decimal("0.01"))),
+            "base_total": float(base_total.quantize(_CENT)),
             "invoice_total": float(parsed_invoice.invoice_total),
             "home_office_adjustment": float(adjustment),
         }
 
-    breakdown_csv = summary_to_csv(summary)
-    grand_total = round(sum(item["total_amount"] for item in summary), 2)
+    breakdown_csv = await run_in_threadpool(summary_to_csv, summary) if include_csv else ""
+    grand_total = float(grand_total_amount)
 
     return {
         "vendor_type": "adobe",
@@ -594,14 +683,7 @@ async def _analyze_adobe(
         "non_user_rows": [],
         "non_user_branch_prompts": [],
         "missing_users": missing_users,
-        "invoice": {
-            "filename": invoice_file.filename,
-            "size_bytes": len(invoice_raw),
-            "invoice_number": parsed_invoice.invoice_number,
-            "invoice_total": float(parsed_invoice.invoice_total) if parsed_invoice.invoice_total else None,
-            "parsed_licenses": sorted(parsed_invoice.per_license_cost.keys()),
-            "directory_users": len(directory),
-        },
+        "invoice": invoice_meta,
         "files": file_summaries,
         "summary": summary,
         "totals": {
@@ -619,39 +701,25 @@ async def _analyze_integricom(
     invoice_file: UploadFile | None,
     integricom_user_updates: str | None,
     integricom_branch_item_updates: str | None,
+    *,
+    include_csv: bool = True,
 ) -> dict[str, Any]:
     if invoice_file is None or not invoice_file.filename:
         raise HTTPException(status_code=400, detail="Integricom mode requires an invoice PDF upload.")
 
     warnings: list[str] = []
-    file_summaries: list[dict[str, Any]] = []
 
-    invoice_raw = await invoice_file.read()
-    parsed_invoice = parse_integricom_invoice(invoice_file.filename, invoice_raw)
+    invoice_raw, csv_payloads = await asyncio.gather(invoice_file.read(), _read_uploads(csv_files))
+    parsed_invoice, (export_users, file_summaries, upload_warnings) = await asyncio.gather(
+        run_in_threadpool(parse_integricom_invoice, invoice_file.filename, invoice_raw),
+        _ingest_export_uploads(csv_payloads, parse_integricom_export_csv),
+    )
     warnings.extend(parsed_invoice.warnings)
     if not parsed_invoice.line_items:
         raise HTTPException(status_code=400, detail="Could not parse Integricom invoice line items.")
 
-    export_users: list[IntegricomExportUser] = []
     csv_upload_requested = bool(csv_files)
-    for upload in csv_files:
-        if not upload.filename:
-            continue
-        raw = await upload.read()
-        if not raw:
-            warnings.append(f"{upload.filename}: empty file skipped.")
-            continue
-
-        parsed_export = parse_integricom_export_csv(upload.filename, raw)
-        export_users.extend(parsed_export.users)
-        file_summaries.append(
-            {
-                "filename": upload.filename,
-                "rows_ingested": len(parsed_export.users),
-                "rows_skipped": parsed_export.rows_skipped,
-            }
-        )
-        warnings.extend(parsed_export.warnings)
+    warnings.extend(upload_warnings)
 
     if not export_users:
         try:
@@ -742,6 +810,15 @@ async def _analyze_integricom(
         directory = list_integricom_users()
 
     directory_profiles = _directory_to_profile_map(directory)
+    # Shared by the enrichment and success responses.
+    invoice_meta = {
+        "filename": invoice_file.filename,
+        "size_bytes": len(invoice_raw),
+        "invoice_number": parsed_invoice.invoice_number,
+        "invoice_total": float(parsed_invoice.invoice_total) if parsed_invoice.invoice_total else None,
+        "parsed_licenses": sorted({line.canonical_name for line in parsed_invoice.line_items}),
+        "directory_users": len(directory),
+    }
     (
         all_rows,
         user_rows,
@@ -749,7 +826,8 @@ async def _analyze_integricom(
         allocation_warnings,
         unresolved_emails,
         unresolved_branch_prompts,
-    ) = build_integricom_user_allocations(
+    ) = await run_in_threadpool(
+        build_integricom_user_allocations,
         export_users,
         directory_profiles,
         parsed_invoice.line_items,
@@ -762,8 +840,9 @@ async def _analyze_integricom(
     )
     warnings.extend(allocation_warnings)
 
-    current_emails = {user.email for user in export_users if user.email}
-    missing_users = _serialize_missing_integricom_users(current_emails)
+    # The directory store normalizes and de-duplicates these itself, so no set is built here.
+    current_emails = (user.email for user in export_users if user.email)
+    missing_users = _serialize_missing_users(find_missing_integricom_users, current_emails)
 
     needs_user_enrichment = bool(unresolved_emails)
     needs_branch_assignment = bool(unresolved_branch_prompts)
@@ -792,14 +871,7 @@ async def _analyze_integricom(
             "summary": [],
             "totals": {"line_items": 0, "grand_total": 0.0},
             "reconciliation": None,
-            "invoice": {
-                "filename": invoice_file.filename,
-                "size_bytes": len(invoice_raw),
-                "invoice_number": parsed_invoice.invoice_number,
-                "invoice_total": float(parsed_invoice.invoice_total) if parsed_invoice.invoice_total else None,
-                "parsed_licenses": sorted({line.canonical_name for line in parsed_invoice.line_items}),
-                "directory_users": len(directory),
-            },
+            "invoice": invoice_meta,
             "warnings": warnings,
             "breakdown_csv": "",
         }
@@ -815,11 +887,12 @@ async def _analyze_integricom(
         ]
     )
 
-    summary = build_breakdown(all_rows)
-    base_total = sum(Decimal(str(item["total_amount"])) for item in summary)
+    summary, base_total = await run_in_threadpool(build_breakdown_with_total, all_rows)
+    grand_total_amount = base_total
     reconciliation = None
     if parsed_invoice.invoice_total is not None:
-        adjustment = (parsed_invoice.invoice_total - base_total).quantize(Decimal("0.01"))
+        adjustment = (parsed_invoice.invoice_total - base_total).quantize(_CENT)
+        grand_total_amount = base_total + adjustment
         summary = apply_home_office_adjustment(
             summary,
             adjustment,
@@ -827,13 +900,13 @@ async def _analyze_integricom(
             home_office_name=INTEGRICOM_HOME_OFFICE,
         )
         reconciliation = {
-            "base_total": float(base_total.quantize(Decimal("0.01"))),
+            "base_total": float(base_total.quantize(_CENT)),
             "invoice_total": float(parsed_invoice.invoice_total),
             "home_office_adjustment": float(adjustment),
         }
 
-    breakdown_csv = summary_to_csv(summary)
-    grand_total = round(sum(item["total_amount"] for item in summary), 2)
+    breakdown_csv = await run_in_threadpool(summary_to_csv, summary) if include_csv else ""
+    grand_total = float(grand_total_amount)
 
     return {
         "vendor_type": "integricom",
@@ -847,14 +920,7 @@ async def _analyze_integricom(
         "non_user_branch_prompts": [],
         "integricom_non_user_branch_prompts": [],
         "missing_users": missing_users,
-        "invoice": {
-            "filename": invoice_file.filename,
-            "size_bytes": len(invoice_raw),
-            "invoice_number": parsed_invoice.invoice_number,
-            "invoice_total": float(parsed_invoice.invoice_total) if parsed_invoice.invoice_total else None,
-            "parsed_licenses": sorted({line.canonical_name for line in parsed_invoice.line_items}),
-            "directory_users": len(directory),
-        },
+        "invoice": invoice_meta,
         "files": file_summaries,
         "summary": summary,
         "totals": {
@@ -870,29 +936,33 @@ async def _analyze_integricom(
 async def _analyze_integricom_support(
     invoice_file: UploadFile | None,
     integricom_support_updates: str | None,
+    *,
+    include_csv: bool = True,
 ) -> dict[str, Any]:
     if invoice_file is None or not invoice_file.filename:
         raise HTTPException(status_code=400, detail="Integricom Support mode requires an invoice PDF upload.")
 
     warnings: list[str] = []
     invoice_raw = await invoice_file.read()
-    parsed_invoice = parse_integricom_support_invoice(invoice_file.filename, invoice_raw)
+    parsed_invoice = await run_in_threadpool(parse_integricom_support_invoice, invoice_file.filename, invoice_raw)
     warnings.extend(parsed_invoice.warnings)
     if not parsed_invoice.blocks:
         raise HTTPException(status_code=400, detail="Could not parse billable support blocks (Bill=Y) from invoice.")
 
     submitted_updates = _parse_integricom_support_updates(integricom_support_updates)
-    line_rows, support_rows, allocation_warnings = build_integricom_support_allocations(
+    line_rows, support_rows, allocation_warnings = await run_in_threadpool(
+        build_integricom_support_allocations,
         parsed_invoice.blocks,
         submitted_updates,
     )
     warnings.extend(allocation_warnings)
 
-    summary = build_breakdown(line_rows)
-    base_total = sum(Decimal(str(item["total_amount"])) for item in summary)
+    summary, base_total = await run_in_threadpool(build_breakdown_with_total, line_rows)
+    grand_total_amount = base_total
     reconciliation = None
     if parsed_invoice.invoice_total is not None:
-        adjustment = (parsed_invoice.invoice_total - base_total).quantize(Decimal("0.01"))
+        adjustment = (parsed_invoice.invoice_total - base_total).quantize(_CENT)
+        grand_total_amount = base_total + adjustment
         summary = apply_home_office_adjustment(
             summary,
             adjustment,
@@ -900,7 +970,7 @@ async def _analyze_integricom_support(
             home_office_name=INTEGRICOM_HOME_OFFICE,
         )
         reconciliation = {
-            "base_total": float(base_total.quantize(Decimal("0.01"))),
+            "base_total": float(base_total.quantize(_CENT)),
             "invoice_total": float(parsed_invoice.invoice_total),
             "home_office_adjustment": float(adjustment),
         }
@@ -913,8 +983,8 @@ async def _analyze_integricom_support(
             "Review the branch column, then analyze again."
         )
 
-    breakdown_csv = summary_to_csv(summary)
-    grand_total = round(sum(item["total_amount"] for item in summary), 2)
+    breakdown_csv = await run_in_threadpool(summary_to_csv, summary) if include_csv else ""
+    grand_total = float(grand_total_amount)
 
     return {
         "vendor_type": "integricom_support",
@@ -950,7 +1020,7 @@ async def _analyze_integricom_support(
     }
 
 
-@app.post("/api/analyze")
+@_post_prerendered_json("/api/analyze")
 async def analyze(
     vendor_type: str = Form(default="generic"),
     csv_files: list[UploadFile] | None = File(default=None),
@@ -959,11 +1029,12 @@ async def analyze(
     integricom_user_updates: str | None = Form(default=None),
     integricom_branch_item_updates: str | None = Form(default=None),
     integricom_support_updates: str | None = Form(default=None),
+    include_csv: bool = Form(default=True),
 ) -> dict:
     uploads = csv_files or []
 
     vendor = vendor_type.strip().lower()
-    if vendor not in {"generic", "hexnode", "adobe", "integricom", "integricom_support"}:
+    if vendor not in _ANALYZE_VENDOR_TYPES:
         raise HTTPException(
             status_code=400,
             detail=(
@@ -975,16 +1046,17 @@ async def analyze(
     if vendor == "adobe":
         if not uploads:
             raise HTTPException(status_code=400, detail="At least one CSV export file is required.")
-        return await _analyze_adobe(uploads, invoice_file, adobe_user_updates)
+        return await _analyze_adobe(uploads, invoice_file, adobe_user_updates, include_csv=include_csv)
     if vendor == "integricom":
         return await _analyze_integricom(
             uploads,
             invoice_file,
             integricom_user_updates,
             integricom_branch_item_updates,
+            include_csv=include_csv,
         )
     if vendor == "integricom_support":
-        return await _analyze_integricom_support(invoice_file, integricom_support_updates)
+        return await _analyze_integricom_support(invoice_file, integricom_support_updates, include_csv=include_csv)
 
     if not uploads:
         raise HTTPException(status_code=400, detail="At least one CSV export file is required.")
@@ -993,16 +1065,12 @@ async def analyze(
     file_summaries: list[dict] = []
     warnings: list[str] = []
 
-    for upload in uploads:
-        if not upload.filename:
-            continue
-
-        raw = await upload.read()
-        if not raw:
+    parse_upload = parse_hexnode_csv if vendor == "hexnode" else parse_csv
+    for upload, parsed in await _parse_uploads(await _read_uploads(uploads), parse_upload):
+        if parsed is None:
             warnings.append(f"{upload.filename}: empty file skipped.")
             continue
 
-        parsed = parse_hexnode_csv(upload.filename, raw) if vendor == "hexnode" else parse_csv(upload.filename, raw)
         all_rows.extend(parsed.rows)
         file_summaries.append(
             {
@@ -1013,54 +1081,54 @@ async def analyze(
         )
         warnings.extend(parsed.warnings)
 
-    summary = build_breakdown(all_rows)
-    breakdown_csv = summary_to_csv(summary)
-    grand_total = round(sum(item["total_amount"] for item in summary), 2)
+    summary, base_total = await run_in_threadpool(build_breakdown_with_total, all_rows)
+    grand_total = float(base_total)
     reconciliation = None
 
     invoice_meta = None
     if invoice_file and invoice_file.filename:
-        invoice_raw = await invoice_file.read()
+        invoice_stream, invoice_size = await _upload_stream(invoice_file)
         if vendor == "hexnode":
-            parsed_invoice = parse_hexnode_invoice(invoice_file.filename, invoice_raw)
+            parsed_invoice = await run_in_threadpool(parse_hexnode_invoice, invoice_file.filename, invoice_stream)
             warnings.extend(parsed_invoice.warnings)
             invoice_meta = {
                 "filename": invoice_file.filename,
-                "size_bytes": len(invoice_raw),
+                "size_bytes": invoice_size,
                 "invoice_number": parsed_invoice.invoice_number,
                 "invoice_total": float(parsed_invoice.invoice_total) if parsed_invoice.invoice_total is not None else None,
                 "billed_device_count": parsed_invoice.billed_device_count,
             }
 
-            if parsed_invoice.billed_device_count is not None and parsed_invoice.billed_device_count != len(all_rows):
-                warnings.append(
-                    f"Invoice says {parsed_invoice.billed_device_count} devices, but CSV has {len(all_rows)} rows."
-                )
+            billed_device_count = parsed_invoice.billed_device_count
+            row_count = len(all_rows)
+            if billed_device_count is not None and billed_device_count != row_count:
+                warnings.append(f"Invoice says {billed_device_count} devices, but CSV has {row_count} rows.")
 
             if parsed_invoice.invoice_total is not None:
-                base_total = sum(Decimal(str(item["total_amount"])) for item in summary)
-                adjustment = (parsed_invoice.invoice_total - base_total).quantize(Decimal("0.01"))
+                adjustment = (parsed_invoice.invoice_total - base_total).quantize(_CENT)
                 summary = apply_home_office_adjustment(
                     summary,
                     adjustment,
                     license_name=HEXNODE_DEFAULT_LICENSE,
                 )
-                breakdown_csv = summary_to_csv(summary)
-                grand_total = round(sum(item["total_amount"] for item in summary), 2)
+                grand_total = float(base_total + adjustment)
                 reconciliation = {
-                    "base_total": float(base_total.quantize(Decimal("0.01"))),
+                    "base_total": float(base_total.quantize(_CENT)),
                     "invoice_total": float(parsed_invoice.invoice_total),
                     "home_office_adjustment": float(adjustment),
                 }
         else:
             invoice_meta = {
                 "filename": invoice_file.filename,
-                "size_bytes": len(invoice_raw),
+                "size_bytes": invoice_size,
                 "note": "Invoice uploaded as reference. Generic invoice parsing is not enabled yet.",
             }
     elif vendor == "hexnode":
         warnings.append("No invoice uploaded. Home Office add-on adjustment was not applied.")
 
+    # Serialized once, after any invoice adjustment has been folded into the summary.
+    breakdown_csv = await run_in_threadpool(summary_to_csv, summary) if include_csv else ""
+
     return {
         "vendor_type": vendor,
         "needs_user_enrichment": False,
@@ -1,24 +1,36 @@
 from __future__ import annotations
 
 import csv
+import functools
 import hashlib
 import io
 import re
-from collections import defaultdict
+import sys
+import threading
+from collections import OrderedDict, defaultdict
 from dataclasses import dataclass
 from decimal import Decimal, InvalidOperation
-from typing import Any
+from operator import itemgetter
+from typing import Any, BinaryIO, Iterator
 
 
+_CENT = Decimal("0.01")
+_ZERO = Decimal("0")
+_ZERO_CENTS = Decimal("0.00")
+
+PDF_TEXT_CACHE_SIZE = 32
+_PDF_TEXT_CACHE: OrderedDict[tuple[Any, bytes], str] = OrderedDict()
+_PDF_TEXT_CACHE_LOCK = threading.Lock()
+
 HEXNODE_DEFAULT_COST = Decimal("2.00")
 HEXNODE_DEFAULT_LICENSE = "Hexnode UEM Cloud Pro Edition"
-HEXNODE_HOME_OFFICE = "Home Office"
+HEXNODE_HOME_OFFICE = sys.intern("Home Office")
 HEXNODE_BRANCH_ALIASES: dict[str, str] = {
     # User-confirmed Hexnode remap rule.
     "Default User": "Home Office",
 }
 
-ADOBE_HOME_OFFICE = "Home Office"
+ADOBE_HOME_OFFICE = sys.intern("Home Office")
 ADOBE_ADJUSTMENT_LICENSE = "Adobe Invoice Adjustment"
 ADOBE_PRODUCT_ALIASES: dict[str, str] = {
     "acrobat pro": "Acrobat Pro",
@@ -37,8 +49,19 @@ ADOBE_PRODUCT_ALIASES: dict[str, str] = {
     "adobe stock – 40 assets a month": "Adobe Stock - 40 assets a month",
     "ai assistant for acrobat": "AI Assistant for Acrobat",
 }
-
-INTEGRICOM_HOME_OFFICE = "Home Office"
+# (required substrings, excluded substrings, canonical product), checked in order; first match wins.
+ADOBE_PRODUCT_FUZZY_RULES: tuple[tuple[tuple[str, ...], tuple[str, ...], str], ...] = (
+    (("acrobat",), ("assistant",), "Acrobat Pro"),
+    (("creative cloud",), (), "Creative Cloud Pro"),
+    (("indesign",), (), "InDesign"),
+    (("illustrator",), (), "Illustrator"),
+    (("lightroom",), (), "Lightroom"),
+    (("photoshop",), (), "Photoshop"),
+    (("adobe stock", "40 assets"), (), "Adobe Stock - 40 assets a month"),
+    (("ai assistant for acrobat",), (), "AI Assistant for Acrobat"),
+)
+
+INTEGRICOM_HOME_OFFICE = sys.intern("Home Office")
 INTEGRICOM_ADJUSTMENT_LICENSE = "Integricom Invoice Adjustment"
 INTEGRICOM_CREDIT_LICENSE = "Integricom Invoice Credit"
 INTEGRICOM_BRANCH_ALIASES: dict[str, str] = {
@@ -62,19 +85,124 @@ INTEGRICOM_DISTRICT_BRANCHES: list[str] = [
     "Tampa",
 ]
 INTEGRICOM_MANAGED_INTERNET_BRANCHES: list[str] = [INTEGRICOM_HOME_OFFICE, *INTEGRICOM_DISTRICT_BRANCHES]
-INTEGRICOM_KNOWN_BRANCHES: list[str] = [
+INTEGRICOM_KNOWN_BRANCHES: tuple[str, ...] = (
     INTEGRICOM_HOME_OFFICE,
     *INTEGRICOM_DISTRICT_BRANCHES,
     "Construction",
     "Sugar Hill",
     "Grayson",
-]
+)
+
+# Same rule shape as ADOBE_PRODUCT_FUZZY_RULES; "or" alternatives are consecutive rules for one canonical line.
+INTEGRICOM_LINE_RULES: tuple[tuple[tuple[str, ...], tuple[str, ...], str], ...] = (
+    (("managed user/workstation",), (), "Workstation"),
+    (("managed firewall",), ("security subscription",), "NetWatch360 Managed Firewall"),
+    (("managed network device",), (), "NetWatch360 Managed Network Device"),
+    (("managed internet",), (), "NetWatch360 Managed Internet"),
+    (("firewall security subscription, main office",), (), "Firewall Security Subscription Main Office"),
+    (("firewall security subscription, district office",), (), "Firewall Security Subscription District Office"),
+    (("latest fw bought in 2025",), (), "Firewall Security Subscription Latest 2025"),
+    (("fw bought in 2025",), (), "Firewall Security Subscription Latest 2025"),
+    (("ticketing system user license",), (), "Ticketing System User License"),
+    (("documentation system",), (), "Documentation System License"),
+    (("monthly recurring block",), (), "Monthly Block Hours"),
+    (("monthly block hours",), (), "Monthly Block Hours"),
+    (("dark web monitoring",), (), "Dark Web Monitoring"),
+    (("it automation tool",), (), "IT Automation Tool"),
+    (("teams rooms pro",), (), "Teams Rooms Pro"),
+    (("netwatch360 mac",), (), "NetWatch360 MAC"),
+    (("managed server", "netwatch360"), (), "NetWatch360 Managed Server"),
+    (("dropbox business standard",), (), "Dropbox Business Standard"),
+    (("office 365 cloud backup",), (), "Office 365 Cloud Backup"),
+    (("server image backup, cloud",), (), "DP Server Image Backup Cloud"),
+    (("business premium", "microsoft 365"), (), "Microsoft Business Premium Annual"),
+    (("power bi pro",), (), "Power BI Pro"),
+    (("project plan 3",), (), "Project Plan 3"),
+    (("exchange online p1",), (), "Exchange Online P1 Annual"),
+    (("microsoft f3",), (), "Microsoft F3 Annual"),
+    (("exchange online plan 2",), (), "Exchange Online P2 Annual"),
+    (("exchange online p2",), (), "Exchange Online P2 Annual"),
+    (("teams essentials",), (), "Microsoft Teams Essentials NCE Annual"),
+    (("microsoft e5",), (), "M365 Microsoft E5"),
+    (("intune",), (), "M365 Intune"),
+    (("prorated m365",), (), "Prorated M365"),
+    (("teams audio conferencing",), (), "Teams Audio Conferencing"),
+    (("aws cloud server",), (), "AWS Cloud Server"),
+    (("keeper enterprise",), (), "Keeper Enterprise Password Manager"),
+)
 
 INTEGRICOM_LICENSE_BP = "Microsoft 365 Business Premium"
 INTEGRICOM_LICENSE_P1 = "Exchange Online (Plan 1)"
 INTEGRICOM_LICENSE_P2 = "Exchange Online (Plan 2)"
 INTEGRICOM_LICENSE_F3 = "Microsoft 365 F3"
 INTEGRICOM_LICENSE_TEAMS_ESSENTIALS = "Microsoft Teams Essentials"
+# Invoice lines allocated per user: a user is charged when they hold any of the listed licenses.
+INTEGRICOM_DYNAMIC_LINE_LICENSES: dict[str, frozenset[str]] = {
+    "Workstation": frozenset(
+        {
+            INTEGRICOM_LICENSE_BP,
+            INTEGRICOM_LICENSE_P1,
+            INTEGRICOM_LICENSE_P2,
+            INTEGRICOM_LICENSE_F3,
+            INTEGRICOM_LICENSE_TEAMS_ESSENTIALS,
+        }
+    ),
+    "Office 365 Cloud Backup": frozenset({INTEGRICOM_LICENSE_BP, INTEGRICOM_LICENSE_P1}),
+    "Microsoft Business Premium Annual": frozenset({INTEGRICOM_LICENSE_BP}),
+    "Exchange Online P1 Annual": frozenset({INTEGRICOM_LICENSE_P1}),
+    "Microsoft F3 Annual": frozenset({INTEGRICOM_LICENSE_F3}),
+    "Exchange Online P2 Annual": frozenset({INTEGRICOM_LICENSE_P2}),
+}
+# Invoice lines billed entirely to Home Office.
+INTEGRICOM_FIXED_HOME_OFFICE_LINES = frozenset(
+    {
+        "NetWatch360 Managed Network Device",
+        "Ticketing System User License",
+        "Documentation System License",
+        "Monthly Block Hours",
+        "Dark Web Monitoring",
+        "IT Automation Tool",
+        "Teams Rooms Pro",
+        "NetWatch360 MAC",
+        "NetWatch360 Managed Server",
+        "Dropbox Business Standard",
+        "DP Server Image Backup Cloud",
+        "Power BI Pro",
+        "Microsoft Teams Essentials NCE Annual",
+        "M365 Microsoft E5",
+        "M365 Intune",
+        "Prorated M365",
+        "AWS Cloud Server",
+        "Keeper Enterprise Password Manager",
+        "Teams Audio Conferencing",
+    }
+)
+# Invoice lines billed entirely to one branch, looked up before the per-unit and split rules.
+INTEGRICOM_SINGLE_BRANCH_LINES: dict[str, str] = {
+    **dict.fromkeys(INTEGRICOM_FIXED_HOME_OFFICE_LINES, INTEGRICOM_HOME_OFFICE),
+    "Firewall Security Subscription Latest 2025": "St. Pete",
+    "Project Plan 3": "Sugar Hill",
+}
+# Invoice lines billed one unit per branch in template order; extra units prompt for a branch.
+INTEGRICOM_UNIT_SEQUENCE_LINES: dict[str, list[str]] = {
+    "NetWatch360 Managed Firewall": INTEGRICOM_DISTRICT_BRANCHES,
+    "NetWatch360 Managed Internet": INTEGRICOM_MANAGED_INTERNET_BRANCHES,
+    "Firewall Security Subscription District Office": [
+        "Canton",
+        "Cobb",
+        "Doraville",
+        "Destin",
+        "Fort Walton",
+        "Tampa",
+        "Savannah",
+        "Charleston",
+        "Nashville",
+        "Color Burst",
+        "Acworth",
+    ],
+}
+INTEGRICOM_MAIN_OFFICE_FIREWALL_LINE = "Firewall Security Subscription Main Office"
+INTEGRICOM_MAIN_OFFICE_FIREWALL_SUGAR_HILL_AMOUNT = Decimal("97.00")
 
 
 HEADER_ALIASES: dict[str, list[str]] = {
@@ -116,6 +244,108 @@ HEADER_ALIASES: dict[str, list[str]] = {
 }
 
 
+def _money_patterns(*patterns: str) -> tuple[re.Pattern[str], ...]:
+    return tuple(re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in patterns)
+
+
+_HEADER_SEPARATOR_RE = re.compile(r"[^a-z0-9]+")
+_PLAIN_DECIMAL_RE = re.compile(r"[0-9]+(?:\.[0-9]+)?")
+_WHITESPACE_RE = re.compile(r"\s+")
+_DIRECT_SUFFIX_RE = re.compile(r"\s*\(DIRECT[^)]*\)\s*", re.IGNORECASE)
+
+_HEXNODE_INVOICE_NUMBER_RE = re.compile(r"Invoice:\s*#?\s*([A-Z0-9-]+)", re.IGNORECASE)
+_HEXNODE_DEVICE_COUNT_RE = re.compile(r"Total device count:\s*([0-9]+)", re.IGNORECASE)
+_HEXNODE_TOTAL_PATTERNS = _money_patterns(
+    r"Total amount payable after discounts\s*\$?\s*([0-9][0-9,]*\.\d{2})",
+    r"Amount Paid\s*\$?\s*([0-9][0-9,]*\.\d{2})",
+    r"Sub Total\s*\$?\s*([0-9][0-9,]*\.\d{2})",
+)
+
+_ADOBE_INVOICE_NUMBER_BEFORE_RE = re.compile(r"([0-9]{6,})\s*Invoice Number", re.IGNORECASE)
+_ADOBE_INVOICE_NUMBER_AFTER_RE = re.compile(r"Invoice Number\s*([0-9]{6,})", re.IGNORECASE)
+_ADOBE_GRAND_TOTAL_RE = re.compile(r"GRAND TOTAL \(USD\)\s*([0-9][0-9,]*\.\d{2})", re.IGNORECASE)
+# Every Adobe line item reads: <product> <qty> EA <unit> <subtotal> <discount>% <discounted> <total>.
+_ADOBE_LINE_ITEM_SUFFIX = (
+    r"\s+([0-9]+)\s+EA\s+[0-9,]+\.\d{2}\s+[0-9,]+\.\d{2}\s+[0-9.]+%\s+[0-9,]+\.\d{2}\s+([0-9,]+\.\d{2})"
+)
+_ADOBE_LINE_ITEM_PRODUCTS: tuple[tuple[str, str], ...] = (
+    ("Illustrator", r"Illustrator"),
+    ("Acrobat Pro", r"Acrobat Pro"),
+    ("Creative Cloud Pro", r"Creative Cloud Pro"),
+    ("InDesign", r"InDesign"),
+    ("Lightroom", r"Lightroom"),
+    ("Photoshop", r"Photoshop"),
+    ("Adobe Stock - 40 assets a month", r"Adobe Stock\s*[–-]\s*40 assets a month"),
+    ("AI Assistant for Acrobat", r"AI Assistant for Acrobat"),
+)
+# One alternation scans the invoice text once; product N is capture group N, then quantity and total.
+_ADOBE_LINE_ITEM_RE = re.compile(
+    "(?:" + "|".join(f"({prefix})" for _, prefix in _ADOBE_LINE_ITEM_PRODUCTS) + ")" + _ADOBE_LINE_ITEM_SUFFIX,
+    re.IGNORECASE,
+)
+_ADOBE_LINE_ITEM_QTY_GROUP = len(_ADOBE_LINE_ITEM_PRODUCTS) + 1
+_ADOBE_LINE_ITEM_TOTAL_GROUP = len(_ADOBE_LINE_ITEM_PRODUCTS) + 2
+
+_INTEGRICOM_INVOICE_NUMBER_RE = re.compile(r"Date\s+Invoice\s*[0-9/]+\s+([0-9]{3,})", re.IGNORECASE)
+_INTEGRICOM_TOTAL_PATTERNS = _money_patterns(
+    r"Invoice Total:\s*\$?\s*([0-9][0-9,]*\.\d{2})",
+    r"Invoice Subtotal:\s*\$?\s*([0-9][0-9,]*\.\d{2})",
+    r"Balance Due:\s*\$?\s*([0-9][0-9,]*\.\d{2})",
+)
+_INTEGRICOM_CREDITS_PATTERNS = _money_patterns(
+    r"Credits:\s*(-?\$?\s*[0-9][0-9,]*\.\d{2})",
+    r"Credits:\s*\(?\$?\s*([0-9][0-9,]*\.\d{2})\)?",
+)
+_INTEGRICOM_SECTION_HEADER_RE = re.compile(
+    "|".join(
+        re.escape(marker)
+        for marker in (
+            "products & other charges quantity price amount",
+            "netwatch360 limited:",
+            "dataprotect 360 backup products:",
+            "microsoft 365 products:",
+            "dropbox products:",
+            "cloud server:",
+            "password manager:",
+        )
+    ),
+    re.IGNORECASE,
+)
+# Summary lines that end a run of wrapped line-item descriptions.
+_INTEGRICOM_SKIP_LINE_PREFIXES = (
+    "total products & other",
+    "invoice subtotal:",
+    "sales tax:",
+    "invoice total:",
+    "payments:",
+    "credits:",
+    "balance due:",
+    "please pay invoices at",
+)
+# Searched rather than matched: the leftmost tail that reaches end-of-line starts right after the
+# description, so there is no lazy description group to backtrack through.
+_INTEGRICOM_LINE_ITEM_TAIL_RE = re.compile(
+    r"(?P<qty>[0-9][0-9,]*\.[0-9]{2})\s+\$?(?P<price>[0-9][0-9,]*\.[0-9]{2})\s+\$?(?P<amount>[0-9][0-9,]*\.[0-9]{2})$"
+)
+
+_INTEGRICOM_SUPPORT_LOCATION_RE = re.compile(r"\s+Location:\s*.*$", re.IGNORECASE)
+_INTEGRICOM_SUPPORT_TOTAL_PATTERNS = _money_patterns(
+    r"Invoice Total:\s*\$?\s*([0-9][0-9,]*\.\d{2})",
+    r"Balance Due:\s*\$?\s*([0-9][0-9,]*\.\d{2})",
+)
+_INTEGRICOM_SUPPORT_CHARGE_TO_RE = re.compile(r"Charge To:\s*", re.IGNORECASE)
+_INTEGRICOM_SUPPORT_COLUMNS_RE = re.compile(r"Date Staff Notes Bill Hours Rate Ext Amt", re.IGNORECASE)
+_INTEGRICOM_SUPPORT_BLOCK_END_RE = re.compile(
+    r"Charge To:|Total Hours:|Invoice Subtotal:|Please pay invoices at", re.IGNORECASE
+)
+_INTEGRICOM_SUPPORT_BILLABLE_RE = re.compile(r"\bY\b")
+# Billable entry: "Y <hours>", optionally followed by "<rate> $<amount>" when the line was not wrapped.
+_INTEGRICOM_SUPPORT_BILL_LINE_RE = re.compile(
+    r"\bY\s+([0-9]+\.[0-9]+)(?:\s+[0-9]+\.[0-9]+\s+\$([0-9][0-9,]*\.\d{2}))?"
+)
+_INTEGRICOM_SUPPORT_SUBTOTAL_PATTERNS = _money_patterns(r"Subtotal:\s*\$?\s*([0-9][0-9,]*\.\d{2})")
+
+
 @dataclass
 class ParseResult:
     filename: str
@@ -217,12 +447,21 @@ class IntegricomSupportInvoiceParseResult:
 
 def _normalize_header(value: str) -> str:
     value = value.strip().lower()
-    value = re.sub(r"[^a-z0-9]+", "_", value)
+    value = _HEADER_SEPARATOR_RE.sub("_", value)
     return value.strip("_")
 
 
 def _match_header(headers: list[str], aliases: list[str]) -> str | None:
+    return _match_normalized_header({_normalize_header(h): h for h in headers}, aliases)
+
+
+def _match_headers(headers: list[str], alias_groups: dict[str, list[str]]) -> dict[str, str | None]:
+    # Normalize the header row once and reuse it for every column category.
     normalized = {_normalize_header(h): h for h in headers}
+    return {column: _match_normalized_header(normalized, aliases) for column, aliases in alias_groups.items()}
+
+
+def _match_normalized_header(normalized: dict[str, str], aliases: list[str]) -> str | None:
     for alias in aliases:
         if alias in normalized:
             return normalized[alias]
@@ -234,13 +473,34 @@ def _match_header(headers: list[str], aliases: list[str]) -> str | None:
     return None
 
 
+def _header_index(headers: list[str], column: str) -> int:
+    # DictReader keeps the last of duplicate header names, so index from the right to match it.
+    return len(headers) - 1 - headers[::-1].index(column)
+
+
+def _column_index(headers: list[str], column: str | None) -> int | None:
+    return _header_index(headers, column) if column else None
+
+
+def _csv_data_rows(reader: Iterator[list[str]], width: int) -> Iterator[list[str]]:
+    # Blank lines are skipped and short rows padded so header indices are always valid.
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < width:
+            row.extend([""] * (width - len(row)))
+        yield row
+
+
 def _decode_bytes(raw: bytes) -> str:
-    for encoding in ("utf-8-sig", "utf-8", "cp1252", "latin-1"):
+    # utf-8-sig also decodes BOM-less UTF-8, so a failure there rules out UTF-8 without a second pass.
+    for encoding in ("utf-8-sig", "cp1252"):
         try:
             return raw.decode(encoding)
         except UnicodeDecodeError:
             continue
-    return raw.decode("utf-8", errors="replace")
+    # latin-1 maps every byte value, so this last attempt cannot fail.
+    return raw.decode("latin-1")
 
 
 def _parse_decimal(value: str | None) -> Decimal | None:
@@ -249,6 +509,9 @@ def _parse_decimal(value: str | None) -> Decimal | None:
     cleaned = value.strip()
     if not cleaned:
         return None
+    # Plain unsigned numbers (the usual CSV cell) need none of the currency/sign cleanup below.
+    if _PLAIN_DECIMAL_RE.fullmatch(cleaned):
+        return Decimal(cleaned)
 
     negative = False
     if cleaned.startswith("(") and cleaned.endswith(")"):
@@ -270,12 +533,14 @@ def _parse_decimal(value: str | None) -> Decimal | None:
 
 def _normalize_product_name(value: str) -> str:
     cleaned = value.strip()
-    cleaned = re.sub(r"\s*\(DIRECT[^)]*\)\s*", "", cleaned, flags=re.IGNORECASE)
+    cleaned = _DIRECT_SUFFIX_RE.sub("", cleaned)
     cleaned = cleaned.replace("–", "-")
-    cleaned = re.sub(r"\s+", " ", cleaned)
+    cleaned = _WHITESPACE_RE.sub(" ", cleaned)
     return cleaned.strip().lower()
 
 
+# Export product tokens repeat across every user, so canonical names are cached per raw token.
+@functools.lru_cache(maxsize=4096)
 def _canonical_adobe_product(value: str) -> str | None:
     normalized = _normalize_product_name(value)
     if not normalized:
@@ -285,31 +550,24 @@ def _canonical_adobe_product(value: str) -> str | None:
         return ADOBE_PRODUCT_ALIASES[normalized]
 
     # Fallback fuzzy contains checks for export variants.
-    if "acrobat" in normalized and "assistant" not in normalized:
-        return "Acrobat Pro"
-    if "creative cloud" in normalized:
-        return "Creative Cloud Pro"
-    if "indesign" in normalized:
-        return "InDesign"
-    if "illustrator" in normalized:
-        return "Illustrator"
-    if "lightroom" in normalized:
-        return "Lightroom"
-    if "photoshop" in normalized:
-        return "Photoshop"
-    if "adobe stock" in normalized and "40 assets" in normalized:
-        return "Adobe Stock - 40 assets a month"
-    if "ai assistant for acrobat" in normalized:
-        return "AI Assistant for Acrobat"
+    return _match_substring_rules(normalized, ADOBE_PRODUCT_FUZZY_RULES)
+
 
+def _match_substring_rules(
+    normalized: str,
+    rules: tuple[tuple[tuple[str, ...], tuple[str, ...], str], ...],
+) -> str | None:
+    for required, excluded, canonical in rules:
+        if all(term in normalized for term in required) and not any(term in normalized for term in excluded):
+            return canonical
     return None
 
 
 def parse_csv(filename: str, raw: bytes) -> ParseResult:
     text = _decode_bytes(raw)
-    reader = csv.DictReader(io.StringIO(text))
-
-    if reader.fieldnames is None:
+    reader = csv.reader(io.StringIO(text))
+    headers = next(reader, None)
+    if headers is None:
         return ParseResult(
             filename=filename,
             rows=[],
@@ -317,12 +575,12 @@ def parse_csv(filename: str, raw: bytes) -> ParseResult:
             warnings=[f"{filename}: no headers found; file skipped."],
         )
 
-    headers = [h for h in reader.fieldnames if h is not None]
-    branch_col = _match_header(headers, HEADER_ALIASES["branch"])
-    license_col = _match_header(headers, HEADER_ALIASES["license"])
-    amount_col = _match_header(headers, HEADER_ALIASES["amount"])
-    qty_col = _match_header(headers, HEADER_ALIASES["quantity"])
-    unit_col = _match_header(headers, HEADER_ALIASES["unit_price"])
+    columns = _match_headers(headers, HEADER_ALIASES)
+    branch_col = columns["branch"]
+    license_col = columns["license"]
+    amount_col = columns["amount"]
+    qty_col = columns["quantity"]
+    unit_col = columns["unit_price"]
 
     warnings: list[str] = []
     if license_col is None:
@@ -332,16 +590,22 @@ def parse_csv(filename: str, raw: bytes) -> ParseResult:
             f"{filename}: no amount column and no quantity+unit price pair found; rows may be skipped."
         )
 
+    branch_idx = _column_index(headers, branch_col)
+    license_idx = _column_index(headers, license_col)
+    amount_idx = _column_index(headers, amount_col)
+    qty_idx = _column_index(headers, qty_col)
+    unit_idx = _column_index(headers, unit_col)
+
     parsed_rows: list[dict[str, Any]] = []
     rows_skipped = 0
 
-    for line_number, row in enumerate(reader, start=2):
-        license_name = (row.get(license_col, "") if license_col else "").strip() if license_col else ""
-        branch = (row.get(branch_col, "") if branch_col else "").strip() if branch_col else ""
-        amount = _parse_decimal(row.get(amount_col)) if amount_col else None
-        if amount is None and qty_col and unit_col:
-            qty = _parse_decimal(row.get(qty_col))
-            unit_price = _parse_decimal(row.get(unit_col))
+    for line_number, row in enumerate(_csv_data_rows(reader, len(headers)), start=2):
+        license_name = row[license_idx].strip() if license_idx is not None else ""
+        branch = row[branch_idx].strip() if branch_idx is not None else ""
+        amount = _parse_decimal(row[amount_idx]) if amount_idx is not None else None
+        if amount is None and qty_idx is not None and unit_idx is not None:
+            qty = _parse_decimal(row[qty_idx])
+            unit_price = _parse_decimal(row[unit_idx])
             if qty is not None and unit_price is not None:
                 amount = qty * unit_price
 
@@ -353,8 +617,9 @@ def parse_csv(filename: str, raw: bytes) -> ParseResult:
         parsed_rows.append(
             {
                 "source_file": filename,
-                "branch": branch or "UNMAPPED_BRANCH",
-                "license": license_name or "UNMAPPED_LICENSE",
+                # Branch and license cells repeat across rows; interning shares one object per name.
+                "branch": sys.intern(branch) if branch else "UNMAPPED_BRANCH",
+                "license": sys.intern(license_name) if license_name else "UNMAPPED_LICENSE",
                 "amount": amount,
             }
         )
@@ -367,74 +632,117 @@ def parse_csv(filename: str, raw: bytes) -> ParseResult:
     )
 
 
+_breakdown_key = itemgetter("branch", "license")
+
+
 def build_breakdown(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    grouped: dict[tuple[str, str], Decimal] = defaultdict(lambda: Decimal("0"))
+    summary, _ = build_breakdown_with_total(rows)
+    return summary
+
+
+def build_breakdown_with_total(rows: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], Decimal]:
+    # Bucket amounts per (branch, license) first, then reduce each bucket with one C-level sum().
+    grouped: dict[tuple[str, str], list[Decimal]] = defaultdict(list)
     for row in rows:
-        key = (row["branch"], row["license"])
-        grouped[key] += row["amount"]
+        grouped[_breakdown_key(row)].append(row["amount"])
 
     summary: list[dict[str, Any]] = []
-    for (branch, license_name), total in sorted(grouped.items()):
+    # Sum of the rounded per-row totals, i.e. exactly what the summary rows add up to.
+    total_amount = _ZERO
+    # Sort keys only: comparing (key, value) item tuples re-tests key equality on every comparison.
+    for branch, license_name in sorted(grouped):
+        amounts = grouped[branch, license_name]
+        rounded = sum(amounts, _ZERO).quantize(_CENT)
+        total_amount += rounded
         summary.append(
             {
                 "branch": branch,
                 "license": license_name,
-                "total_amount": float(total.quantize(Decimal("0.01"))),
+                "total_amount": float(rounded),
             }
         )
-    return summary
+    return summary, total_amount
 
 
-def build_branch_totals(summary: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    grouped: dict[str, Decimal] = defaultdict(lambda: Decimal("0"))
+def _branch_total_cents(summary: list[dict[str, Any]]) -> dict[str, int]:
+    # Summary totals are already rounded to cents, so integer cents sum exactly without a
+    # Decimal(str(float)) parse per row; int / 100 rounds to the same float as the quantized Decimal.
+    grouped: dict[str, int] = defaultdict(int)
     for row in summary:
-        grouped[row["branch"]] += Decimal(str(row["total_amount"]))
+        grouped[row["branch"]] += round(row["total_amount"] * 100)
+    return grouped
+
 
+def build_branch_totals(summary: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    grouped = _branch_total_cents(summary)
     totals: list[dict[str, Any]] = []
-    for branch, total in sorted(grouped.items()):
+    for branch in sorted(grouped):
+        total_cents = grouped[branch]
         totals.append(
             {
                 "branch": branch,
-                "total_amount": float(total.quantize(Decimal("0.01"))),
+                "total_amount": total_cents / 100,
             }
         )
     return totals
 
 
 def summary_to_csv(summary: list[dict[str, Any]]) -> str:
-    branch_totals = build_branch_totals(summary)
-    branch_lookup = {row["branch"]: row["total_amount"] for row in branch_totals}
+    grouped = _branch_total_cents(summary)
+    branch_lookup = {branch: grouped[branch] / 100 for branch in sorted(grouped)}
 
     buffer = io.StringIO()
     writer = csv.writer(buffer)
     # Put branch-level pivot totals first so exports open with the allocation rollup.
     writer.writerow(["Branch", "Total"])
-    for row in branch_totals:
-        writer.writerow([row["branch"], row["total_amount"]])
-
-    grand_total = round(sum(row["total_amount"] for row in branch_totals), 2)
-    writer.writerow(["Grand Total", "", grand_total])
+    writer.writerows(branch_lookup.items())
+    writer.writerow(["Grand Total", "", sum(grouped.values()) / 100])
     writer.writerow([])
 
     writer.writerow(["Branch", "License", "TotalAmount", "BranchTotal"])
-    for row in summary:
-        branch_total = branch_lookup.get(row["branch"], row["total_amount"])
-        writer.writerow([row["branch"], row["license"], row["total_amount"], branch_total])
+    writer.writerows((row["branch"], row["license"], row["total_amount"], branch_lookup[row["branch"]]) for row in summary)
     return buffer.getvalue()
 
 
-def _money_from_text(text: str, patterns: list[str]) -> Decimal | None:
+def clear_pdf_text_cache() -> None:
+    with _PDF_TEXT_CACHE_LOCK:
+        _PDF_TEXT_CACHE.clear()
+
+
+def _extract_pdf_text(reader_cls: Any, raw: bytes | BinaryIO) -> str:
+    # Upload streams are read by pypdf in place and not cached.
+    if not isinstance(raw, bytes):
+        return "\n".join((page.extract_text() or "") for page in reader_cls(raw).pages)
+
+    # Invoices are re-submitted with each enrichment round, so text is cached by content digest.
+    # The reader class is part of the key so a different PDF backend never serves another's text.
+    key = (reader_cls, hashlib.blake2b(raw, digest_size=16).digest())
+    with _PDF_TEXT_CACHE_LOCK:
+        cached = _PDF_TEXT_CACHE.get(key)
+        if cached is not None:
+            _PDF_TEXT_CACHE.move_to_end(key)
+            return cached
+
+    text = "\n".join((page.extract_text() or "") for page in reader_cls(io.BytesIO(raw)).pages)
+    with _PDF_TEXT_CACHE_LOCK:
+        _PDF_TEXT_CACHE[key] = text
+        if len(_PDF_TEXT_CACHE) > PDF_TEXT_CACHE_SIZE:
+            _PDF_TEXT_CACHE.popitem(last=False)
+    return text
+
+
+def _money_from_text(text: str, patterns: tuple[re.Pattern[str], ...]) -> Decimal | None:
     for pattern in patterns:
-        match = re.search(pattern, text, flags=re.IGNORECASE | re.DOTALL)
+        match = pattern.search(text)
         if not match:
             continue
         value = _parse_decimal(match.group(1))
         if value is not None:
-            return value.quantize(Decimal("0.01"))
+            return value.quantize(_CENT)
     return None
 
 
-def parse_hexnode_invoice(filename: str, raw: bytes) -> InvoiceParseResult:
+def parse_hexnode_invoice(filename: str, raw: bytes | BinaryIO) -> InvoiceParseResult:
     warnings: list[str] = []
     invoice_number: str | None = None
     invoice_total: Decimal | None = None
@@ -452,8 +760,7 @@ def parse_hexnode_invoice(filename: str, raw: bytes) -> InvoiceParseResult:
         )
 
     try:
-        reader = PdfReader(io.BytesIO(raw))
-        text = "\n".join((page.extract_text() or "") for page in reader.pages)
+        text = _extract_pdf_text(PdfReader, raw)
     except Exception as exc:
         return InvoiceParseResult(
             filename=filename,
@@ -463,22 +770,15 @@ def parse_hexnode_invoice(filename: str, raw: bytes) -> InvoiceParseResult:
             warnings=[f"Could not parse PDF text from {filename}: {exc}"],
         )
 
-    invoice_match = re.search(r"Invoice:\s*#?\s*([A-Z0-9-]+)", text, flags=re.IGNORECASE)
+    invoice_match = _HEXNODE_INVOICE_NUMBER_RE.search(text)
     if invoice_match:
         invoice_number = invoice_match.group(1).strip()
 
-    invoice_total = _money_from_text(
-        text,
-        patterns=[
-            r"Total amount payable after discounts\s*\$?\s*([0-9][0-9,]*\.\d{2})",
-            r"Amount Paid\s*\$?\s*([0-9][0-9,]*\.\d{2})",
-            r"Sub Total\s*\$?\s*([0-9][0-9,]*\.\d{2})",
-        ],
-    )
+    invoice_total = _money_from_text(text, _HEXNODE_TOTAL_PATTERNS)
     if invoice_total is None:
         warnings.append(f"{filename}: could not extract invoice total.")
 
-    count_match = re.search(r"Total device count:\s*([0-9]+)", text, flags=re.IGNORECASE)
+    count_match = _HEXNODE_DEVICE_COUNT_RE.search(text)
     if count_match:
         billed_device_count = int(count_match.group(1))
 
@@ -498,8 +798,9 @@ def parse_hexnode_csv(
     branch_aliases: dict[str, str] | None = None,
 ) -> ParseResult:
     text = _decode_bytes(raw)
-    reader = csv.DictReader(io.StringIO(text))
-    if reader.fieldnames is None:
+    reader = csv.reader(io.StringIO(text))
+    headers = next(reader, None)
+    if headers is None:
         return ParseResult(
             filename=filename,
             rows=[],
@@ -507,7 +808,6 @@ def parse_hexnode_csv(
             warnings=[f"{filename}: no headers found; file skipped."],
         )
 
-    headers = [h for h in reader.fieldnames if h is not None]
     username_col = _match_header(headers, ["username", "branch", "location", "site"])
     if username_col is None:
         return ParseResult(
@@ -516,6 +816,8 @@ def parse_hexnode_csv(
             rows_skipped=0,
             warnings=[f"{filename}: could not find Username/Branch column for Hexnode export."],
         )
+    # Only the Username/Branch cell is read, so no per-row dict of every device column is built.
+    username_idx = _header_index(headers, username_col)
 
     aliases = {**HEXNODE_BRANCH_ALIASES}
     if branch_aliases:
@@ -525,14 +827,15 @@ def parse_hexnode_csv(
     rows_skipped = 0
     warnings: list[str] = []
 
-    for line_number, row in enumerate(reader, start=2):
-        raw_branch = (row.get(username_col) or "").strip()
+    for line_number, row in enumerate(_csv_data_rows(reader, len(headers)), start=2):
+        raw_branch = row[username_idx].strip()
         if not raw_branch:
             rows_skipped += 1
             warnings.append(f"{filename}: row {line_number} skipped (blank Username/Branch).")
             continue
 
-        mapped_branch = aliases.get(raw_branch, raw_branch)
+        # Device exports repeat a handful of branch names; interning shares one object per name.
+        mapped_branch = sys.intern(aliases.get(raw_branch, raw_branch))
         rows.append(
             {
                 "source_file": filename,
@@ -563,8 +866,7 @@ def parse_adobe_invoice(filename: str, raw: bytes) -> AdobeInvoiceParseResult:
         )
 
     try:
-        reader = PdfReader(io.BytesIO(raw))
-        text = "\n".join((page.extract_text() or "") for page in reader.pages)
+        text = _extract_pdf_text(PdfReader, raw)
     except Exception as exc:
         return AdobeInvoiceParseResult(
             filename=filename,
@@ -574,38 +876,35 @@ def parse_adobe_invoice(filename: str, raw: bytes) -> AdobeInvoiceParseResult:
             warnings=[f"Could not parse PDF text from {filename}: {exc}"],
         )
 
-    invoice_match = re.search(r"([0-9]{6,})\s*Invoice Number", text, flags=re.IGNORECASE)
+    invoice_match = _ADOBE_INVOICE_NUMBER_BEFORE_RE.search(text)
     if not invoice_match:
-        invoice_match = re.search(r"Invoice Number\s*([0-9]{6,})", text, flags=re.IGNORECASE)
+        invoice_match = _ADOBE_INVOICE_NUMBER_AFTER_RE.search(text)
     if invoice_match:
         invoice_number = invoice_match.group(1).strip()
 
-    total_match = re.search(r"GRAND TOTAL \(USD\)\s*([0-9][0-9,]*\.\d{2})", text, flags=re.IGNORECASE)
+    total_match = _ADOBE_GRAND_TOTAL_RE.search(text)
     if total_match:
         invoice_total = _parse_decimal(total_match.group(1))
     if invoice_total is None:
         warnings.append(f"{filename}: could not extract Adobe invoice grand total.")
 
-    product_patterns = {
-        "Illustrator": r"Illustrator\s+([0-9]+)\s+EA\s+[0-9,]+\.\d{2}\s+[0-9,]+\.\d{2}\s+[0-9.]+%\s+[0-9,]+\.\d{2}\s+([0-9,]+\.\d{2})",
-        "Acrobat Pro": r"Acrobat Pro\s+([0-9]+)\s+EA\s+[0-9,]+\.\d{2}\s+[0-9,]+\.\d{2}\s+[0-9.]+%\s+[0-9,]+\.\d{2}\s+([0-9,]+\.\d{2})",
-        "Creative Cloud Pro": r"Creative Cloud Pro\s+([0-9]+)\s+EA\s+[0-9,]+\.\d{2}\s+[0-9,]+\.\d{2}\s+[0-9.]+%\s+[0-9,]+\.\d{2}\s+([0-9,]+\.\d{2})",
-        "InDesign": r"InDesign\s+([0-9]+)\s+EA\s+[0-9,]+\.\d{2}\s+[0-9,]+\.\d{2}\s+[0-9.]+%\s+[0-9,]+\.\d{2}\s+([0-9,]+\.\d{2})",
-        "Lightroom": r"Lightroom\s+([0-9]+)\s+EA\s+[0-9,]+\.\d{2}\s+[0-9,]+\.\d{2}\s+[0-9.]+%\s+[0-9,]+\.\d{2}\s+([0-9,]+\.\d{2})",
-        "Photoshop": r"Photoshop\s+([0-9]+)\s+EA\s+[0-9,]+\.\d{2}\s+[0-9,]+\.\d{2}\s+[0-9.]+%\s+[0-9,]+\.\d{2}\s+([0-9,]+\.\d{2})",
-        "Adobe Stock - 40 assets a month": r"Adobe Stock\s*[–-]\s*40 assets a month\s+([0-9]+)\s+EA\s+[0-9,]+\.\d{2}\s+[0-9,]+\.\d{2}\s+[0-9.]+%\s+[0-9,]+\.\d{2}\s+([0-9,]+\.\d{2})",
-        "AI Assistant for Acrobat": r"AI Assistant for Acrobat\s+([0-9]+)\s+EA\s+[0-9,]+\.\d{2}\s+[0-9,]+\.\d{2}\s+[0-9.]+%\s+[0-9,]+\.\d{2}\s+([0-9,]+\.\d{2})",
-    }
+    # Only the first line item per product counts, as with a per-product search.
+    first_matches: dict[str, re.Match[str]] = {}
+    for match in _ADOBE_LINE_ITEM_RE.finditer(text):
+        product = next(
+            product for index, (product, _) in enumerate(_ADOBE_LINE_ITEM_PRODUCTS, start=1) if match.start(index) >= 0
+        )
+        first_matches.setdefault(product, match)
 
-    for product, pattern in product_patterns.items():
-        match = re.search(pattern, text, flags=re.IGNORECASE)
+    for product, _ in _ADOBE_LINE_ITEM_PRODUCTS:
+        match = first_matches.get(product)
         if not match:
             continue
-        qty = _parse_decimal(match.group(1))
-        total = _parse_decimal(match.group(2))
-        if qty is None or total is None or qty == Decimal("0"):
+        qty = _parse_decimal(match.group(_ADOBE_LINE_ITEM_QTY_GROUP))
+        total = _parse_decimal(match.group(_ADOBE_LINE_ITEM_TOTAL_GROUP))
+        if qty is None or total is None or qty == _ZERO:
             continue
-        per_license_cost[product] = (total / qty).quantize(Decimal("0.01"))
+        per_license_cost[product] = (total / qty).quantize(_CENT)
 
     if not per_license_cost:
         warnings.append(f"{filename}: no Adobe line-item pricing could be extracted.")
@@ -624,8 +923,9 @@ def parse_adobe_export_csv(
     raw: bytes,
 ) -> AdobeExportParseResult:
     text = _decode_bytes(raw)
-    reader = csv.DictReader(io.StringIO(text))
-    if reader.fieldnames is None:
+    reader = csv.reader(io.StringIO(text))
+    headers = next(reader, None)
+    if headers is None:
         return AdobeExportParseResult(
             filename=filename,
             users=[],
@@ -633,11 +933,19 @@ def parse_adobe_export_csv(
             warnings=[f"{filename}: no headers found; file skipped."],
         )
 
-    headers = [h for h in reader.fieldnames if h is not None]
-    email_col = _match_header(headers, ["email", "user_email"])
-    first_name_col = _match_header(headers, ["first_name", "first", "given_name"])
-    last_name_col = _match_header(headers, ["last_name", "last", "surname", "family_name"])
-    team_products_col = _match_header(headers, ["team_products", "products", "product", "licenses", "license"])
+    columns = _match_headers(
+        headers,
+        {
+            "email": ["email", "user_email"],
+            "first_name": ["first_name", "first", "given_name"],
+            "last_name": ["last_name", "last", "surname", "family_name"],
+            "team_products": ["team_products", "products", "product", "licenses", "license"],
+        },
+    )
+    email_col = columns["email"]
+    first_name_col = columns["first_name"]
+    last_name_col = columns["last_name"]
+    team_products_col = columns["team_products"]
 
     if email_col is None or team_products_col is None:
         return AdobeExportParseResult(
@@ -647,25 +955,29 @@ def parse_adobe_export_csv(
             warnings=[f"{filename}: expected Adobe export columns (Email, Team Products) were not found."],
         )
 
+    email_idx = _header_index(headers, email_col)
+    team_products_idx = _header_index(headers, team_products_col)
+    first_name_idx = _column_index(headers, first_name_col)
+    last_name_idx = _column_index(headers, last_name_col)
+
     users: list[AdobeExportUser] = []
     rows_skipped = 0
     warnings: list[str] = []
 
-    for line_number, row in enumerate(reader, start=2):
-        email = (row.get(email_col) or "").strip().lower()
+    for line_number, row in enumerate(_csv_data_rows(reader, len(headers)), start=2):
+        email = row[email_idx].strip().lower()
         if not email:
             rows_skipped += 1
             warnings.append(f"{filename}: row {line_number} skipped (missing email).")
             continue
 
-        raw_products = (row.get(team_products_col) or "").strip()
-        product_tokens = [token.strip() for token in raw_products.split(",") if token.strip()]
+        product_tokens = [sys.intern(token) for token in map(str.strip, row[team_products_idx].split(",")) if token]
         users.append(
             AdobeExportUser(
                 source_file=filename,
                 email=email,
-                first_name=(row.get(first_name_col) or "").strip() if first_name_col else "",
-                last_name=(row.get(last_name_col) or "").strip() if last_name_col else "",
+                first_name=row[first_name_idx].strip() if first_name_idx is not None else "",
+                last_name=row[last_name_idx].strip() if last_name_idx is not None else "",
                 products=product_tokens,
             )
         )
@@ -733,6 +1045,8 @@ def build_adobe_user_allocations(
     line_rows: list[dict[str, Any]] = []
     warnings: list[str] = []
     unresolved_emails: list[str] = []
+    # Set mirror of unresolved_emails so membership checks stay O(1) while the list keeps first-seen order.
+    unresolved_seen: set[str] = set()
     warned_unknown_product: set[str] = set()
     warned_missing_cost: set[str] = set()
     user_rows_map: dict[str, dict[str, Any]] = {}
@@ -750,18 +1064,18 @@ def build_adobe_user_allocations(
             first_name = first_name or (profile.get("first_name") or "").strip()
             last_name = last_name or (profile.get("last_name") or "").strip()
 
-        if email not in user_rows_map:
-            user_rows_map[email] = {
+        row_entry = user_rows_map.get(email)
+        if row_entry is None:
+            row_entry = user_rows_map[email] = {
                 "email": email,
                 "first_name": first_name,
                 "last_name": last_name,
                 "branch": branch,
-                "licenses": [],
-                "user_total": Decimal("0"),
+                # Insertion-ordered set of canonical licenses.
+                "licenses": {},
+                "user_total": _ZERO,
                 "known_user": bool(branch),
             }
-
-        row_entry = user_rows_map[email]
         if branch and not row_entry["branch"]:
             row_entry["branch"] = branch
             row_entry["known_user"] = True
@@ -778,8 +1092,7 @@ def build_adobe_user_allocations(
                     warned_unknown_product.add(token)
                 continue
 
-            if canonical not in row_entry["licenses"]:
-                row_entry["licenses"].append(canonical)
+            row_entry["licenses"][canonical] = None
 
             cost = per_license_cost.get(canonical)
             if cost is None:
@@ -799,7 +1112,8 @@ def build_adobe_user_allocations(
                     }
                 )
 
-        if not row_entry["branch"] and email not in unresolved_emails:
+        if not row_entry["branch"] and email not in unresolved_seen:
+            unresolved_seen.add(email)
             unresolved_emails.append(email)
 
     user_rows: list[dict[str, Any]] = []
@@ -811,7 +1125,7 @@ def build_adobe_user_allocations(
                 "last_name": row["last_name"],
                 "branch": row["branch"],
                 "license_list": ", ".join(row["licenses"]),
-                "user_total": float(Decimal(str(row["user_total"])).quantize(Decimal("0.01"))),
+                "user_total": float(row["user_total"].quantize(_CENT)),
                 "known_user": bool(row["branch"]),
             }
         )
@@ -830,91 +1144,25 @@ def _normalize_integricom_branch(office: str | None, department: str | None = No
 
 def _normalize_integricom_text(value: str) -> str:
     cleaned = value.replace("–", "-")
-    cleaned = re.sub(r"\s+", " ", cleaned)
+    cleaned = _WHITESPACE_RE.sub(" ", cleaned)
     return cleaned.strip()
 
 
 def _is_integricom_section_header(line: str) -> bool:
-    lowered = line.lower()
-    return any(
-        marker in lowered
-        for marker in (
-            "products & other charges quantity price amount",
-            "netwatch360 limited:",
-            "dataprotect 360 backup products:",
-            "microsoft 365 products:",
-            "dropbox products:",
-            "cloud server:",
-            "password manager:",
-        )
-    )
+    return _INTEGRICOM_SECTION_HEADER_RE.search(line) is not None
 
 
+# Invoices are re-parsed on every branch-assignment round-trip, so descriptions repeat.
+@functools.lru_cache(maxsize=4096)
 def _canonical_integricom_line(description: str) -> str:
-    normalized = _normalize_integricom_text(description).lower()
-    if "managed user/workstation" in normalized:
-        return "Workstation"
-    if "managed firewall" in normalized and "security subscription" not in normalized:
-        return "NetWatch360 Managed Firewall"
-    if "managed network device" in normalized:
-        return "NetWatch360 Managed Network Device"
-    if "managed internet" in normalized:
-        return "NetWatch360 Managed Internet"
-    if "firewall security subscription, main office" in normalized:
-        return "Firewall Security Subscription Main Office"
-    if "firewall security subscription, district office" in normalized:
-        return "Firewall Security Subscription District Office"
-    if "latest fw bought in 2025" in normalized or "fw bought in 2025" in normalized:
-        return "Firewall Security Subscription Latest 2025"
-    if "ticketing system user license" in normalized:
-        return "Ticketing System User License"
-    if "documentation system" in normalized:
-        return "Documentation System License"
-    if "monthly recurring block" in normalized or "monthly block hours" in normalized:
-        return "Monthly Block Hours"
-    if "dark web monitoring" in normalized:
-        return "Dark Web Monitoring"
-    if "it automation tool" in normalized:
-        return "IT Automation Tool"
-    if "teams rooms pro" in normalized:
-        return "Teams Rooms Pro"
-    if "netwatch360 mac" in normalized:
-        return "NetWatch360 MAC"
-    if "managed server" in normalized and "netwatch360" in normalized:
-        return "NetWatch360 Managed Server"
-    if "dropbox business standard" in normalized:
-        return "Dropbox Business Standard"
-    if "office 365 cloud backup" in normalized:
-        return "Office 365 Cloud Backup"
-    if "server image backup, cloud" in normalized:
-        return "DP Server Image Backup Cloud"
-    if "business premium" in normalized and "microsoft 365" in normalized:
-        return "Microsoft Business Premium Annual"
-    if "power bi pro" in normalized:
-        return "Power BI Pro"
-    if "project plan 3" in normalized:
-        return "Project Plan 3"
-    if "exchange online p1" in normalized:
-        return "Exchange Online P1 Annual"
-    if "microsoft f3" in normalized:
-        return "Microsoft F3 Annual"
-    if "exchange online plan 2" in normalized or "exchange online p2" in normalized:
-        return "Exchange Online P2 Annual"
-    if "teams essentials" in normalized:
-        return "Microsoft Teams Essentials NCE Annual"
-    if "microsoft e5" in normalized:
-        return "M365 Microsoft E5"
-    if "intune" in normalized:
-        return "M365 Intune"
-    if "prorated m365" in normalized:
-        return "Prorated M365"
-    if "teams audio conferencing" in normalized:
-        return "Teams Audio Conferencing"
-    if "aws cloud server" in normalized:
-        return "AWS Cloud Server"
-    if "keeper enterprise" in normalized or normalized == "keeper":
+    cleaned = _normalize_integricom_text(description)
+    normalized = cleaned.lower()
+    canonical = _match_substring_rules(normalized, INTEGRICOM_LINE_RULES)
+    if canonical is not None:
+        return canonical
+    if normalized == "keeper":
         return "Keeper Enterprise Password Manager"
-    return _normalize_integricom_text(description)
+    return cleaned
 
 
 def parse_integricom_invoice(filename: str, raw: bytes) -> IntegricomInvoiceParseResult:
@@ -930,84 +1178,57 @@ def parse_integricom_invoice(filename: str, raw: bytes) -> IntegricomInvoicePars
             filename=filename,
             invoice_number=None,
             invoice_total=None,
-            credits_total=Decimal("0.00"),
+            credits_total=_ZERO_CENTS,
             line_items=[],
             warnings=["Invoice parser unavailable (pypdf not installed)."],
         )
 
     try:
-        reader = PdfReader(io.BytesIO(raw))
-        text = "\n".join((page.extract_text() or "") for page in reader.pages)
+        text = _extract_pdf_text(PdfReader, raw)
     except Exception as exc:
         return IntegricomInvoiceParseResult(
             filename=filename,
             invoice_number=None,
             invoice_total=None,
-            credits_total=Decimal("0.00"),
+            credits_total=_ZERO_CENTS,
             line_items=[],
             warnings=[f"Could not parse PDF text from {filename}: {exc}"],
         )
 
-    number_match = re.search(r"Date\s+Invoice\s*[0-9/]+\s+([0-9]{3,})", text, flags=re.IGNORECASE)
+    number_match = _INTEGRICOM_INVOICE_NUMBER_RE.search(text)
     if number_match:
         invoice_number = number_match.group(1).strip()
 
-    invoice_total = _money_from_text(
-        text,
-        patterns=[
-            r"Invoice Total:\s*\$?\s*([0-9][0-9,]*\.\d{2})",
-            r"Invoice Subtotal:\s*\$?\s*([0-9][0-9,]*\.\d{2})",
-            r"Balance Due:\s*\$?\s*([0-9][0-9,]*\.\d{2})",
-        ],
-    )
-    credits_total = _money_from_text(
-        text,
-        patterns=[
-            r"Credits:\s*(-?\$?\s*[0-9][0-9,]*\.\d{2})",
-            r"Credits:\s*\(?\$?\s*([0-9][0-9,]*\.\d{2})\)?",
-        ],
-    )
-    credits_total = credits_total or Decimal("0.00")
-    if invoice_total is not None and credits_total is not None and credits_total != Decimal("0.00"):
-        invoice_total = (invoice_total + credits_total).quantize(Decimal("0.01"))
+    invoice_total = _money_from_text(text, _INTEGRICOM_TOTAL_PATTERNS)
+    credits_total = _money_from_text(text, _INTEGRICOM_CREDITS_PATTERNS)
+    credits_total = credits_total or _ZERO_CENTS
+    if invoice_total is not None and credits_total != _ZERO:
+        # Both amounts come from _money_from_text already quantized, so the sum is exact cents.
+        invoice_total = invoice_total + credits_total
         warnings.append(
             f"{filename}: applied invoice credits of {credits_total} to the Home Office adjustment."
         )
     if invoice_total is None:
         warnings.append(f"{filename}: could not extract Integricom invoice total.")
 
-    pattern = re.compile(
-        r"^(?P<desc>.*?)(?P<qty>[0-9][0-9,]*\.[0-9]{2})\s+\$?(?P<price>[0-9][0-9,]*\.[0-9]{2})\s+\$?(?P<amount>[0-9][0-9,]*\.[0-9]{2})$"
-    )
     description_buffer: list[str] = []
     for raw_line in text.splitlines():
         line = _normalize_integricom_text(raw_line)
         if not line:
             continue
-        lowered = line.lower()
-        if _is_integricom_section_header(line):
-            description_buffer = []
-            continue
-        if lowered.startswith("total products & other"):
-            description_buffer = []
-            continue
-        if lowered.startswith("invoice subtotal:") or lowered.startswith("sales tax:"):
-            description_buffer = []
-            continue
-        if lowered.startswith("invoice total:") or lowered.startswith("payments:") or lowered.startswith("credits:"):
-            description_buffer = []
-            continue
-        if lowered.startswith("balance due:") or lowered.startswith("please pay invoices at"):
+        if _is_integricom_section_header(line) or line.lower().startswith(_INTEGRICOM_SKIP_LINE_PREFIXES):
             description_buffer = []
             continue
 
-        match = pattern.match(line)
+        # Line items end in a cent amount, so lines ending in anything but a digit skip the regex.
+        match = _INTEGRICOM_LINE_ITEM_TAIL_RE.search(line) if line[-1] in "0123456789" else None
         if match:
-            inline_desc = _normalize_integricom_text(match.group("desc"))
+            # The line is already normalized, so its prefix only needs the space before qty trimmed,
+            # and joining normalized buffer lines with single spaces stays normalized.
+            inline_desc = line[: match.start()].rstrip()
             if inline_desc:
-                description = _normalize_integricom_text(" ".join([*description_buffer, inline_desc]))
-            else:
-                description = _normalize_integricom_text(" ".join(description_buffer))
+                description_buffer.append(inline_desc)
+            description = " ".join(description_buffer)
             description_buffer = []
             if not description:
                 continue
@@ -1024,9 +1245,9 @@ def parse_integricom_invoice(filename: str, raw: bytes) -> IntegricomInvoicePars
                 IntegricomInvoiceLine(
                     description=description,
                     canonical_name=canonical_name,
-                    quantity=qty.quantize(Decimal("0.01")),
-                    unit_price=price.quantize(Decimal("0.01")),
-                    amount=amount.quantize(Decimal("0.01")),
+                    quantity=qty.quantize(_CENT),
+                    unit_price=price.quantize(_CENT),
+                    amount=amount.quantize(_CENT),
                 )
             )
             continue
@@ -1050,16 +1271,37 @@ def _integricom_support_summary_from_header(header: str) -> str:
     cleaned = _normalize_integricom_text(header)
     if " / " in cleaned:
         cleaned = cleaned.split(" / ", 1)[1]
-    cleaned = re.sub(r"\s+Location:\s*.*$", "", cleaned, flags=re.IGNORECASE)
+    cleaned = _INTEGRICOM_SUPPORT_LOCATION_RE.sub("", cleaned)
     return cleaned.strip()
 
 
+def _iter_integricom_support_blocks(text: str) -> Iterator[tuple[str, str]]:
+    # Yields (header, body) per "Charge To:" block with forward literal searches only, so malformed PDFs
+    # cannot trigger the backtracking a lazy-dot-plus-lookahead pattern would.
+    text_end = len(text) - 1 if text.endswith("\n") else len(text)
+    position = 0
+    while True:
+        charge_match = _INTEGRICOM_SUPPORT_CHARGE_TO_RE.search(text, position)
+        if charge_match is None:
+            return
+        columns_match = _INTEGRICOM_SUPPORT_COLUMNS_RE.search(text, charge_match.end())
+        if columns_match is None:
+            return
+        end_match = _INTEGRICOM_SUPPORT_BLOCK_END_RE.search(text, columns_match.end())
+        body_end = end_match.start() if end_match is not None else max(text_end, columns_match.end())
+        yield text[charge_match.end() : columns_match.start()], text[columns_match.end() : body_end]
+        position = body_end
+
+
+_INTEGRICOM_SUPPORT_BRANCH_KEYWORDS: tuple[tuple[str, str], ...] = tuple(
+    (branch, branch.lower()) for branch in INTEGRICOM_KNOWN_BRANCHES if branch != INTEGRICOM_HOME_OFFICE
+)
+
+
 def _infer_integricom_support_branch(charge_summary: str) -> tuple[str, str, str]:
     summary_lower = charge_summary.lower()
-    for branch in INTEGRICOM_KNOWN_BRANCHES:
-        if branch == INTEGRICOM_HOME_OFFICE:
-            continue
-        if branch.lower() in summary_lower:
+    for branch, keyword in _INTEGRICOM_SUPPORT_BRANCH_KEYWORDS:
+        if keyword in summary_lower:
             return branch, "high", f"Found branch keyword '{branch}' in charge summary."
 
     return (
@@ -1087,8 +1329,7 @@ def parse_integricom_support_invoice(filename: str, raw: bytes) -> IntegricomSup
         )
 
     try:
-        reader = PdfReader(io.BytesIO(raw))
-        text = "\n".join((page.extract_text() or "") for page in reader.pages)
+        text = _extract_pdf_text(PdfReader, raw)
     except Exception as exc:
         return IntegricomSupportInvoiceParseResult(
             filename=filename,
@@ -1098,65 +1339,44 @@ def parse_integricom_support_invoice(filename: str, raw: bytes) -> IntegricomSup
             warnings=[f"Could not parse PDF text from {filename}: {exc}"],
         )
 
-    number_match = re.search(r"Date\s+Invoice\s*[0-9/]+\s+([0-9]{3,})", text, flags=re.IGNORECASE)
+    number_match = _INTEGRICOM_INVOICE_NUMBER_RE.search(text)
     if number_match:
         invoice_number = number_match.group(1).strip()
 
-    invoice_total = _money_from_text(
-        text,
-        patterns=[
-            r"Invoice Total:\s*\$?\s*([0-9][0-9,]*\.\d{2})",
-            r"Balance Due:\s*\$?\s*([0-9][0-9,]*\.\d{2})",
-        ],
-    )
+    invoice_total = _money_from_text(text, _INTEGRICOM_SUPPORT_TOTAL_PATTERNS)
     if invoice_total is None:
         warnings.append(f"{filename}: could not extract Integricom support invoice total.")
 
-    block_pattern = re.compile(
-        r"Charge To:\s*(?P<header>.*?)Date Staff Notes Bill Hours Rate Ext Amt(?P<body>.*?)(?=Charge To:|Total Hours:|Invoice Subtotal:|Please pay invoices at|$)",
-        flags=re.IGNORECASE | re.DOTALL,
-    )
+    for block_index, (raw_header, body) in enumerate(_iter_integricom_support_blocks(text), start=1):
+        header = _normalize_integricom_text(raw_header)
 
-    for block_index, match in enumerate(block_pattern.finditer(text), start=1):
-        header = _normalize_integricom_text(match.group("header"))
-        body = match.group("body")
-
-        billable_entries = len(re.findall(r"\bY\b", body))
+        billable_entries = len(_INTEGRICOM_SUPPORT_BILLABLE_RE.findall(body))
         if billable_entries == 0:
             continue
 
-        billable_hours = Decimal("0.00")
-        for hours_match in re.finditer(r"\bY\s+([0-9]+\.[0-9]+)", body):
-            parsed_hours = _parse_decimal(hours_match.group(1))
-            if parsed_hours is not None:
-                billable_hours += parsed_hours
-        billable_hours = billable_hours.quantize(Decimal("0.01"))
-
-        line_amount_total = Decimal("0.00")
-        for amount_match in re.finditer(
-            r"\bY\s+[0-9]+\.[0-9]+\s+[0-9]+\.[0-9]+\s+\$([0-9][0-9,]*\.\d{2})",
-            body,
-        ):
-            parsed_amount = _parse_decimal(amount_match.group(1))
-            if parsed_amount is not None:
-                line_amount_total += parsed_amount
-        line_amount_total = line_amount_total.quantize(Decimal("0.01"))
-
-        subtotal = _money_from_text(body, [r"Subtotal:\s*\$?\s*([0-9][0-9,]*\.\d{2})"])
-        if subtotal is None and line_amount_total == Decimal("0.00"):
+        # One scan collects hours and line amounts. Hours captures are plain digits-dot-digits, and amount
+        # captures always carry exactly two decimals, so amounts sum exactly as integer cents.
+        billable_hours = _ZERO
+        line_amount_cents = 0
+        for bill_match in _INTEGRICOM_SUPPORT_BILL_LINE_RE.finditer(body):
+            billable_hours += Decimal(bill_match.group(1))
+            amount_text = bill_match.group(2)
+            if amount_text is not None:
+                line_amount_cents += int(amount_text.replace(",", "").replace(".", ""))
+        billable_hours = billable_hours.quantize(_CENT)
+
+        # Block subtotal is the most stable source in this PDF layout; line captures can be truncated on wraps.
+        subtotal = _money_from_text(body, _INTEGRICOM_SUPPORT_SUBTOTAL_PATTERNS)
+        if subtotal is None and line_amount_cents == 0:
             warnings.append(
                 f"{filename}: block {block_index} has billable entries but no parseable subtotal/line amount; skipped."
             )
             continue
-
-        # Block subtotal is the most stable source in this PDF layout; line captures can be truncated on wraps.
-        amount = subtotal if subtotal is not None else line_amount_total
-        if amount is None:
-            continue
+        amount = subtotal if subtotal is not None else Decimal(line_amount_cents).scaleb(-2)
 
         charge_summary = _integricom_support_summary_from_header(header)
         row_seed = f"{block_index}:{charge_summary.lower()}"
-        row_key = f"{block_index}:{hashlib.sha1(row_seed.encode('utf-8')).hexdigest()[:10]}"
+        row_key = f"{block_index}:{hashlib.blake2s(row_seed.encode('utf-8'), digest_size=5).hexdigest()}"
 
         blocks.append(
             IntegricomSupportBlock(
@@ -1164,7 +1384,7 @@ def parse_integricom_support_invoice(filename: str, raw: bytes) -> IntegricomSup
                 charge_summary=charge_summary or f"Support Block {block_index}",
                 billable_entries=billable_entries,
                 billable_hours=billable_hours,
-                amount=amount.quantize(Decimal("0.01")),
+                amount=amount,
             )
         )
 
@@ -1245,8 +1465,9 @@ def build_integricom_support_allocations(
 
 def parse_integricom_export_csv(filename: str, raw: bytes) -> IntegricomExportParseResult:
     text = _decode_bytes(raw)
-    reader = csv.DictReader(io.StringIO(text))
-    if reader.fieldnames is None:
+    reader = csv.reader(io.StringIO(text))
+    headers = next(reader, None)
+    if headers is None:
         return IntegricomExportParseResult(
             filename=filename,
             users=[],
@@ -1254,21 +1475,28 @@ def parse_integricom_export_csv(filename: str, raw: bytes) -> IntegricomExportPa
             warnings=[f"{filename}: no headers found; file skipped."],
         )
 
-    headers = [h for h in reader.fieldnames if h is not None]
-    email_col = _match_header(
+    columns = _match_headers(
         headers,
-        [
-            "user_principal_name",
-            "user_principal",
-            "email",
-            "user_email",
-        ],
+        {
+            "email": [
+                "user_principal_name",
+                "user_principal",
+                "email",
+                "user_email",
+            ],
+            "first_name": ["first_name", "first", "given_name"],
+            "last_name": ["last_name", "last", "surname", "family_name"],
+            "office": ["office", "branch", "location", "site"],
+            "department": ["department", "dept", "division"],
+            "licenses": ["licenses", "license", "products"],
+        },
     )
-    first_name_col = _match_header(headers, ["first_name", "first", "given_name"])
-    last_name_col = _match_header(headers, ["last_name", "last", "surname", "family_name"])
-    office_col = _match_header(headers, ["office", "branch", "location", "site"])
-    department_col = _match_header(headers, ["department", "dept", "division"])
-    licenses_col = _match_header(headers, ["licenses", "license", "products"])
+    email_col = columns["email"]
+    first_name_col = columns["first_name"]
+    last_name_col = columns["last_name"]
+    office_col = columns["office"]
+    department_col = columns["department"]
+    licenses_col = columns["licenses"]
 
     if email_col is None or licenses_col is None:
         return IntegricomExportParseResult(
@@ -1278,11 +1506,18 @@ def parse_integricom_export_csv(filename: str, raw: bytes) -> IntegricomExportPa
             warnings=[f"{filename}: expected columns (User principal name, Licenses) were not found."],
         )
 
+    email_idx = _header_index(headers, email_col)
+    licenses_idx = _header_index(headers, licenses_col)
+    first_name_idx = _column_index(headers, first_name_col)
+    last_name_idx = _column_index(headers, last_name_col)
+    office_idx = _column_index(headers, office_col)
+    department_idx = _column_index(headers, department_col)
+
     users: list[IntegricomExportUser] = []
     warnings: list[str] = []
     rows_skipped = 0
-    for line_number, row in enumerate(reader, start=2):
-        email = (row.get(email_col) or "").strip().lower()
+    for line_number, row in enumerate(_csv_data_rows(reader, len(headers)), start=2):
+        email = row[email_idx].strip().lower()
         if not email:
             rows_skipped += 1
             warnings.append(f"{filename}: row {line_number} skipped (missing email).")
@@ -1291,26 +1526,27 @@ def parse_integricom_export_csv(filename: str, raw: bytes) -> IntegricomExportPa
             rows_skipped += 1
             continue
 
-        licenses_raw = (row.get(licenses_col) or "").strip()
+        licenses_raw = row[licenses_idx].strip()
         if not licenses_raw or licenses_raw.lower() == "unlicensed":
             rows_skipped += 1
             continue
 
-        tokens = [token.strip() for token in licenses_raw.split("+") if token.strip()]
+        # License and branch names repeat across users; interning shares one object per name.
+        tokens = [sys.intern(token) for token in map(str.strip, licenses_raw.split("+")) if token]
         if not tokens:
             rows_skipped += 1
             continue
 
-        office = (row.get(office_col) or "").strip() if office_col else ""
-        department = (row.get(department_col) or "").strip() if department_col else ""
+        office = row[office_idx].strip() if office_idx is not None else ""
+        department = row[department_idx].strip() if department_idx is not None else ""
         users.append(
             IntegricomExportUser(
                 source_file=filename,
                 email=email,
-                first_name=(row.get(first_name_col) or "").strip() if first_name_col else "",
-                last_name=(row.get(last_name_col) or "").strip() if last_name_col else "",
+                first_name=row[first_name_idx].strip() if first_name_idx is not None else "",
+                last_name=row[last_name_idx].strip() if last_name_idx is not None else "",
                 office=office,
-                default_branch=_normalize_integricom_branch(office, department),
+                default_branch=sys.intern(_normalize_integricom_branch(office, department)),
                 licenses=tokens,
             )
         )
@@ -1323,32 +1559,6 @@ def parse_integricom_export_csv(filename: str, raw: bytes) -> IntegricomExportPa
     )
 
 
-def _integricom_user_matches_rule(user: IntegricomExportUser, canonical_line: str) -> bool:
-    tokens = set(user.licenses)
-    if canonical_line == "Workstation":
-        return any(
-            token in tokens
-            for token in (
-                INTEGRICOM_LICENSE_BP,
-                INTEGRICOM_LICENSE_P1,
-                INTEGRICOM_LICENSE_P2,
-                INTEGRICOM_LICENSE_F3,
-                INTEGRICOM_LICENSE_TEAMS_ESSENTIALS,
-            )
-        )
-    if canonical_line == "Office 365 Cloud Backup":
-        return INTEGRICOM_LICENSE_BP in tokens or INTEGRICOM_LICENSE_P1 in tokens
-    if canonical_line == "Microsoft Business Premium Annual":
-        return INTEGRICOM_LICENSE_BP in tokens
-    if canonical_line == "Exchange Online P1 Annual":
-        return INTEGRICOM_LICENSE_P1 in tokens
-    if canonical_line == "Microsoft F3 Annual":
-        return INTEGRICOM_LICENSE_F3 in tokens
-    if canonical_line == "Exchange Online P2 Annual":
-        return INTEGRICOM_LICENSE_P2 in tokens
-    return False
-
-
 def _allocate_integricom_fixed_line(
     line: IntegricomInvoiceLine,
     *,
@@ -1359,12 +1569,12 @@ def _allocate_integricom_fixed_line(
     warnings: list[str] = []
     pending_branch_prompts: list[dict[str, Any]] = []
     qty_int = int(line.quantity)
-    unit = line.unit_price.quantize(Decimal("0.01"))
-    total = line.amount.quantize(Decimal("0.01"))
+    unit = line.unit_price.quantize(_CENT)
+    total = line.amount.quantize(_CENT)
 
     def add_row(branch: str, amount: Decimal) -> None:
-        amount = amount.quantize(Decimal("0.01"))
-        if amount == Decimal("0.00"):
+        amount = amount.quantize(_CENT)
+        if amount == _ZERO:
             return
         rows.append(
             {
@@ -1443,50 +1653,23 @@ def _allocate_integricom_fixed_line(
             )
             return
 
-        assigned_amount = (unit * Decimal(len(assigned_branch_order))).quantize(Decimal("0.01"))
-        remainder = (total - assigned_amount).quantize(Decimal("0.01"))
-        if remainder != Decimal("0.00"):
+        assigned_amount = (unit * Decimal(len(assigned_branch_order))).quantize(_CENT)
+        remainder = total - assigned_amount
+        if remainder != _ZERO:
             add_row(INTEGRICOM_HOME_OFFICE, remainder)
 
-    fixed_home_office = {
-        "Ticketing System User License",
-        "Documentation System License",
-        "Monthly Block Hours",
-        "Dark Web Monitoring",
-        "IT Automation Tool",
-        "Teams Rooms Pro",
-        "NetWatch360 MAC",
-        "NetWatch360 Managed Server",
-        "Dropbox Business Standard",
-        "DP Server Image Backup Cloud",
-        "Power BI Pro",
-        "Microsoft Teams Essentials NCE Annual",
-        "M365 Microsoft E5",
-        "M365 Intune",
-        "Prorated M365",
-        "AWS Cloud Server",
-        "Keeper Enterprise Password Manager",
-        "Teams Audio Conferencing",
-    }
-
-    if line.canonical_name in fixed_home_office:
-        add_row(INTEGRICOM_HOME_OFFICE, total)
-        return rows, warnings, pending_branch_prompts
-
-    if line.canonical_name == "NetWatch360 Managed Firewall":
-        allocate_by_unit_sequence(INTEGRICOM_DISTRICT_BRANCHES)
-        return rows, warnings, pending_branch_prompts
-
-    if line.canonical_name == "NetWatch360 Managed Network Device":
-        add_row(INTEGRICOM_HOME_OFFICE, total)
+    single_branch = INTEGRICOM_SINGLE_BRANCH_LINES.get(line.canonical_name)
+    if single_branch is not None:
+        add_row(single_branch, total)
         return rows, warnings, pending_branch_prompts
 
-    if line.canonical_name == "NetWatch360 Managed Internet":
-        allocate_by_unit_sequence(INTEGRICOM_MANAGED_INTERNET_BRANCHES)
+    sequence_branches = INTEGRICOM_UNIT_SEQUENCE_LINES.get(line.canonical_name)
+    if sequence_branches is not None:
+        allocate_by_unit_sequence(sequence_branches)
         return rows, warnings, pending_branch_prompts
 
-    if line.canonical_name == "Firewall Security Subscription Main Office":
-        sugar_hill_amount = Decimal("97.00")
+    if line.canonical_name == INTEGRICOM_MAIN_OFFICE_FIREWALL_LINE:
+        sugar_hill_amount = INTEGRICOM_MAIN_OFFICE_FIREWALL_SUGAR_HILL_AMOUNT
         if total >= sugar_hill_amount:
             add_row("Sugar Hill", sugar_hill_amount)
             add_row(INTEGRICOM_HOME_OFFICE, total - sugar_hill_amount)
@@ -1497,32 +1680,6 @@ def _allocate_integricom_fixed_line(
             )
         return rows, warnings, pending_branch_prompts
 
-    if line.canonical_name == "Firewall Security Subscription District Office":
-        allocate_by_unit_sequence(
-            [
-                "Canton",
-                "Cobb",
-                "Doraville",
-                "Destin",
-                "Fort Walton",
-                "Tampa",
-                "Savannah",
-                "Charleston",
-                "Nashville",
-                "Color Burst",
-                "Acworth",
-            ]
-        )
-        return rows, warnings, pending_branch_prompts
-
-    if line.canonical_name == "Firewall Security Subscription Latest 2025":
-        add_row("St. Pete", total)
-        return rows, warnings, pending_branch_prompts
-
-    if line.canonical_name == "Project Plan 3":
-        add_row("Sugar Hill", total)
-        return rows, warnings, pending_branch_prompts
-
     add_row(INTEGRICOM_HOME_OFFICE, total)
     warnings.append(
         f"{line.canonical_name}: no Integricom allocation rule configured; amount allocated to Home Office."
@@ -1537,9 +1694,12 @@ def build_integricom_user_allocations(
     branch_item_updates: list[dict[str, Any]] | None = None,
 ) -> tuple[list[dict[str, Any]], list[dict[str, Any]], list[dict[str, Any]], list[str], list[str], list[dict[str, Any]]]:
     line_rows: list[dict[str, Any]] = []
-    non_user_rows_raw: list[dict[str, Any]] = []
+    # Non-user amounts are already quantized to cents, so they are grouped as exact integer cents.
+    non_user_cents: dict[tuple[str, str, str], int] = defaultdict(int)
     warnings: list[str] = []
     unresolved_emails: list[str] = []
+    # Set mirror of unresolved_emails so membership checks stay O(1) while the list keeps first-seen order.
+    unresolved_seen: set[str] = set()
     unresolved_branch_prompts: list[dict[str, Any]] = []
     user_rows_map: dict[str, dict[str, Any]] = {}
     branch_assignment_updates_map: dict[tuple[str, int], str] = {}
@@ -1575,33 +1735,33 @@ def build_integricom_user_allocations(
             "first_name": first_name,
             "last_name": last_name,
             "branch": branch,
-            "licenses": [],
-            "user_total": Decimal("0.00"),
+            "licenses": {},  # Insertion-ordered set of canonical licenses.
+            "user_total": _ZERO_CENTS,
             "known_user": bool(profile and (profile.get("branch") or "").strip()),
         }
-        if not branch and email not in unresolved_emails:
+        if not branch and email not in unresolved_seen:
+            unresolved_seen.add(email)
             unresolved_emails.append(email)
 
-    dynamic_licenses = {
-        "Workstation",
-        "Office 365 Cloud Backup",
-        "Microsoft Business Premium Annual",
-        "Exchange Online P1 Annual",
-        "Microsoft F3 Annual",
-        "Exchange Online P2 Annual",
+    # Bucket users per dynamic line in one pass over users; buckets keep export order.
+    matched_users_by_line: dict[str, list[IntegricomExportUser]] = {
+        canonical: [] for canonical in INTEGRICOM_DYNAMIC_LINE_LICENSES
     }
+    for user in users:
+        for canonical, qualifying_licenses in INTEGRICOM_DYNAMIC_LINE_LICENSES.items():
+            if not qualifying_licenses.isdisjoint(user.licenses):
+                matched_users_by_line[canonical].append(user)
 
     for line_index, line in enumerate(invoice_lines, start=1):
         line_key = f"{line_index}:{line.canonical_name}"
-        if line.canonical_name in dynamic_licenses:
-            matched_users = [user for user in users if _integricom_user_matches_rule(user, line.canonical_name)]
+        matched_users = matched_users_by_line.get(line.canonical_name)
+        if matched_users is not None:
             matched_count = len(matched_users)
             for user in matched_users:
                 entry = user_rows_map.get(user.email)
                 if entry is None:
                     continue
-                if line.canonical_name not in entry["licenses"]:
-                    entry["licenses"].append(line.canonical_name)
+                entry["licenses"][line.canonical_name] = None
                 entry["user_total"] += line.unit_price
                 if entry["branch"]:
                     line_rows.append(
@@ -1619,9 +1779,9 @@ def build_integricom_user_allocations(
                     f"{line.canonical_name}: invoice quantity is {invoice_qty}, matched users are {matched_count}; difference allocated to Home Office."
                 )
 
-            allocated_total = (line.unit_price * Decimal(matched_count)).quantize(Decimal("0.01"))
-            remainder = (line.amount - allocated_total).quantize(Decimal("0.01"))
-            if remainder != Decimal("0.00"):
+            allocated_total = (line.unit_price * Decimal(matched_count)).quantize(_CENT)
+            remainder = (line.amount - allocated_total).quantize(_CENT)
+            if remainder != _ZERO:
                 remainder_row = {
                     "source_file": "invoice",
                     "branch": INTEGRICOM_HOME_OFFICE,
@@ -1629,12 +1789,7 @@ def build_integricom_user_allocations(
                     "amount": remainder,
                 }
                 line_rows.append(remainder_row)
-                non_user_rows_raw.append(
-                    {
-                        **remainder_row,
-                        "allocation_type": "Invoice Delta",
-                    }
-                )
+                non_user_cents[INTEGRICOM_HOME_OFFICE, line.canonical_name, "Invoice Delta"] += int(remainder.scaleb(2))
             continue
 
         fixed_rows, fixed_warnings, pending_branch_rows = _allocate_integricom_fixed_line(
@@ -1643,31 +1798,19 @@ def build_integricom_user_allocations(
             branch_assignment_updates=branch_assignment_updates_map,
         )
         line_rows.extend(fixed_rows)
-        non_user_rows_raw.extend(
-            [
-                {
-                    **row,
-                    "allocation_type": "Fixed Branch Item",
-                }
-                for row in fixed_rows
-            ]
-        )
+        for row in fixed_rows:
+            non_user_cents[row["branch"], row["license"], "Fixed Branch Item"] += int(row["amount"].scaleb(2))
         warnings.extend(fixed_warnings)
         unresolved_branch_prompts.extend(pending_branch_rows)
 
-    grouped_non_user: dict[tuple[str, str, str], Decimal] = defaultdict(lambda: Decimal("0"))
-    for row in non_user_rows_raw:
-        key = (row["branch"], row["license"], row["allocation_type"])
-        grouped_non_user[key] += row["amount"]
-
     non_user_rows: list[dict[str, Any]] = []
-    for (branch, license_name, allocation_type), total in sorted(grouped_non_user.items()):
+    for branch, license_name, allocation_type in sorted(non_user_cents):
         non_user_rows.append(
             {
                 "branch": branch,
                 "license": license_name,
                 "allocation_type": allocation_type,
-                "total_amount": float(total.quantize(Decimal("0.01"))),
+                "total_amount": non_user_cents[branch, license_name, allocation_type] / 100,
             }
         )
 
@@ -1680,7 +1823,7 @@ def build_integricom_user_allocations(
                 "last_name": row["last_name"],
                 "branch": row["branch"],
                 "license_list": ", ".join(row["licenses"]),
-                "user_total": float(Decimal(str(row["user_total"])).quantize(Decimal("0.01"))),
+                "user_total": float(row["user_total"].quantize(_CENT)),
                 "known_user": bool(row["branch"]),
             }
         )
@@ -1695,27 +1838,27 @@ def apply_home_office_adjustment(
     license_name: str = HEXNODE_DEFAULT_LICENSE,
     home_office_name: str = HEXNODE_HOME_OFFICE,
 ) -> list[dict[str, Any]]:
-    if adjustment == Decimal("0"):
+    if adjustment == _ZERO:
         return summary
 
-    updated = [dict(row) for row in summary]
-    updated_row = None
-    for row in updated:
+    # Only the Home Office row changes, so copy that one row and share the rest with the caller.
+    updated = list(summary)
+    for index, row in enumerate(updated):
         if row["branch"] == home_office_name and row["license"] == license_name:
-            updated_row = row
+            updated_row = updated[index] = dict(row)
             break
-
-    if updated_row is None:
-        updated.append(
-            {
-                "branch": home_office_name,
-                "license": license_name,
-                "total_amount": 0.0,
-            }
-        )
-        updated_row = updated[-1]
-
-    current = Decimal(str(updated_row["total_amount"]))
-    updated_row["total_amount"] = float((current + adjustment).quantize(Decimal("0.01")))
-    updated.sort(key=lambda item: (item["branch"], item["license"]))
+    else:
+        updated_row = {
+            "branch": home_office_name,
+            "license": license_name,
+            "total_amount": 0.0,
+        }
+        updated.append(updated_row)
+
+    # Summary totals are whole cents, so work in integer cents; the adjustment is rounded to cents in
+    # the same half-even step quantize would use, and int / 100 gives the same float as the Decimal.
+    current_cents = round(updated_row["total_amount"] * 100)
+    updated_row["total_amount"] = int((adjustment.scaleb(2) + current_cents).to_integral_value()) / 100
+    # Summaries arrive sorted, so timsort only has to place an appended row.
+    updated.sort(key=_breakdown_key)
     return updated
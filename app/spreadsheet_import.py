@@ -9,6 +9,7 @@ from typing import Iterable
 from xml.etree import ElementTree
 
 ADOBE_HOME_OFFICE = "Home Office"
+_HEADER_SEPARATOR_RE = re.compile(r"[^a-z0-9]+")
 
 
 @dataclass
@@ -19,7 +20,7 @@ class AdobeDirectoryImportResult:
 
 
 def _normalize_header(value: str) -> str:
-    return re.sub(r"[^a-z0-9]+", "", (value or "").strip().lower())
+    return _HEADER_SEPARATOR_RE.sub("", (value or "").strip().lower())
 
 
 def _is_email(value: str) -> bool:
@@ -1,6 +1,18 @@
 from pathlib import Path
 import sys
 
+import pytest
+
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+from app.processing import clear_pdf_text_cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _reset_pdf_text_cache():
+    # Tests swap in fake PdfReader classes, so extracted text must not leak between them.
+    clear_pdf_text_cache()
+    yield
+    clear_pdf_text_cache()
@@ -94,3 +94,59 @@ def test_deactivate_adobe_users_marks_user_inactive(tmp_path: Path) -> None:
 
     assert "active@example.com" not in active_users
     assert all_users["active@example.com"].is_active is False
+
+
+def test_init_adobe_directory_runs_backfill_once_until_reset(tmp_path: Path) -> None:
+    db_path = tmp_path / "adobe_users.sqlite3"
+    adobe_directory.ADOBE_DIRECTORY_DB = db_path
+
+    conn = adobe_directory.sqlite3.connect(db_path)
+    conn.execute(
+        """
+        CREATE TABLE adobe_users (
+            email TEXT PRIMARY KEY,
+            first_name TEXT NOT NULL DEFAULT '',
+            last_name TEXT NOT NULL DEFAULT '',
+            branch TEXT NOT NULL,
+            is_active INTEGER NOT NULL DEFAULT 1,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            last_seen_at TEXT
+        )
+        """
+    )
+    conn.commit()
+
+    adobe_directory.init_adobe_directory()
+    conn.execute(
+        """
+        INSERT INTO adobe_users (email, first_name, last_name, branch, is_active, created_at, updated_at, last_seen_at)
+        VALUES ('blank@example.com', 'Blank', 'Branch', '', 1, '2025-01-01T00:00:00+00:00', '2025-01-01T00:00:00+00:00', NULL)
+        """
+    )
+    conn.commit()
+    conn.close()
+
+    adobe_directory.init_adobe_directory()
+    assert adobe_directory.list_adobe_users()["blank@example.com"].branch == ""
+
+    adobe_directory.reset_init_state()
+    adobe_directory.init_adobe_directory()
+    assert adobe_directory.list_adobe_users()["blank@example.com"].branch == "Home Office"
+
+
+def test_touch_seen_users_keeps_names_when_blank_and_stamps_last_seen(tmp_path: Path) -> None:
+    db_path = tmp_path / "adobe_users.sqlite3"
+    adobe_directory.ADOBE_DIRECTORY_DB = db_path
+
+    adobe_directory.upsert_adobe_users(
+        [{"email": "seen@example.com", "first_name": "Seen", "last_name": "User", "branch": "Acworth"}],
+        last_seen_at="2025-01-01T00:00:00+00:00",
+    )
+    adobe_directory.touch_seen_users([{"email": "seen@example.com", "first_name": "", "last_name": "Renamed"}])
+
+    user = adobe_directory.list_adobe_users()["seen@example.com"]
+    assert user.first_name == "Seen"
+    assert user.last_name == "Renamed"
+    assert user.last_seen_at == user.updated_at
+    assert user.last_seen_at != "2025-01-01T00:00:00+00:00"
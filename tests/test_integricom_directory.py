@@ -1,6 +1,7 @@
+import threading
 from pathlib import Path
 
-from app import integricom_directory
+from app import directory_store, integricom_directory
 
 
 def test_integricom_directory_upsert_and_missing(tmp_path: Path) -> None:
@@ -58,3 +59,117 @@ def test_deactivate_integricom_users_marks_user_inactive(tmp_path: Path) -> None
 
     assert "active@example.com" not in active_users
     assert all_users["active@example.com"].is_active is False
+
+
+def test_find_missing_integricom_users_handles_large_current_email_sets(tmp_path: Path) -> None:
+    db_path = tmp_path / "integricom_users.sqlite3"
+    integricom_directory.INTEGRICOM_DIRECTORY_DB = db_path
+
+    integricom_directory.upsert_integricom_users(
+        [
+            {"email": "kept@example.com", "first_name": "Kept", "last_name": "User", "branch": "Acworth"},
+            {"email": "gone@example.com", "first_name": "Gone", "last_name": "User", "branch": "Tampa"},
+        ]
+    )
+
+    current_emails = {f"user{index}@example.com" for index in range(40000)} | {"kept@example.com"}
+    missing = integricom_directory.find_missing_integricom_users(current_emails)
+
+    assert [user.email for user in missing] == ["gone@example.com"]
+
+
+def test_upsert_integricom_users_collapses_duplicate_emails_last_wins(tmp_path: Path) -> None:
+    db_path = tmp_path / "integricom_users.sqlite3"
+    integricom_directory.INTEGRICOM_DIRECTORY_DB = db_path
+
+    integricom_directory.upsert_integricom_users(
+        [
+            {"email": "dup@example.com", "first_name": "Dup", "last_name": "User", "branch": "Acworth"},
+            {"email": "DUP@example.com ", "first_name": "Dup", "last_name": "User", "branch": "Tampa"},
+            {"email": "dup@example.com", "first_name": "Dup", "last_name": "User", "branch": ""},
+        ]
+    )
+
+    users = integricom_directory.list_integricom_users()
+    assert list(users) == ["dup@example.com"]
+    assert users["dup@example.com"].branch == "Tampa"
+
+
+def test_upsert_and_touch_skip_rows_that_are_already_current(tmp_path: Path, monkeypatch) -> None:
+    integricom_directory.INTEGRICOM_DIRECTORY_DB = tmp_path / "integricom_users.sqlite3"
+    user = {"email": "user1@example.com", "first_name": "User", "last_name": "One", "branch": "Acworth"}
+
+    monkeypatch.setattr(directory_store, "utc_now", lambda: "2024-01-01T00:00:00+00:00")
+    integricom_directory.upsert_integricom_users([user], last_seen_at="2024-01-01T00:00:00+00:00")
+
+    monkeypatch.setattr(directory_store, "utc_now", lambda: "2024-01-02T00:00:00+00:00")
+    integricom_directory.upsert_integricom_users([user], last_seen_at="2024-01-01T00:00:00+00:00")
+    assert integricom_directory.list_integricom_users()["user1@example.com"].updated_at == "2024-01-01T00:00:00+00:00"
+
+    integricom_directory.touch_seen_integricom_users([user])
+    with integricom_directory._STORE.connect() as conn:
+        before = conn.total_changes
+        integricom_directory.upsert_integricom_users([user], last_seen_at="2024-01-02T00:00:00+00:00")
+        integricom_directory.touch_seen_integricom_users([user])
+        assert conn.total_changes == before
+
+    integricom_directory.upsert_integricom_users(
+        [{**user, "branch": "Home Office"}], last_seen_at="2024-01-02T00:00:00+00:00"
+    )
+    assert integricom_directory.list_integricom_users()["user1@example.com"].branch == "Home Office"
+
+
+def test_repeated_syncs_only_advance_last_seen_at(tmp_path: Path, monkeypatch) -> None:
+    integricom_directory.INTEGRICOM_DIRECTORY_DB = tmp_path / "integricom_users.sqlite3"
+    user = {"email": "user1@example.com", "first_name": "User", "last_name": "One", "branch": "Acworth"}
+
+    for sync_time in ("2024-01-01T00:00:00+00:00", "2024-01-02T00:00:00+00:00"):
+        monkeypatch.setattr(directory_store, "utc_now", lambda sync_time=sync_time: sync_time)
+        integricom_directory.upsert_integricom_users([user])
+        integricom_directory.touch_seen_integricom_users([user])
+
+    stored = integricom_directory.list_integricom_users()["user1@example.com"]
+    assert stored.updated_at == "2024-01-01T00:00:00+00:00"
+    assert stored.last_seen_at == "2024-01-02T00:00:00+00:00"
+
+    with integricom_directory._STORE.connect() as conn:
+        before = conn.total_changes
+        monkeypatch.setattr(directory_store, "utc_now", lambda: "2024-01-03T00:00:00+00:00")
+        integricom_directory.upsert_integricom_users([user])
+        integricom_directory.touch_seen_integricom_users([user])
+        # One last_seen_at bump for the upsert; the touch sees the same timestamp and writes nothing.
+        assert conn.total_changes == before + 1
+    assert integricom_directory.list_integricom_users()["user1@example.com"].updated_at == "2024-01-01T00:00:00+00:00"
+
+
+def test_explicit_last_seen_at_is_stored_as_given(tmp_path: Path, monkeypatch) -> None:
+    integricom_directory.INTEGRICOM_DIRECTORY_DB = tmp_path / "integricom_users.sqlite3"
+    user = {"email": "user1@example.com", "first_name": "User", "last_name": "One", "branch": "Acworth"}
+    monkeypatch.setattr(directory_store, "utc_now", lambda: "2024-01-05T00:00:00+00:00")
+
+    integricom_directory.upsert_integricom_users([user])
+    integricom_directory.upsert_integricom_users([user], last_seen_at="2024-01-01T00:00:00+00:00")
+    assert integricom_directory.list_integricom_users()["user1@example.com"].last_seen_at == "2024-01-01T00:00:00+00:00"
+
+
+def test_concurrent_init_on_fresh_database(tmp_path: Path) -> None:
+    integricom_directory.INTEGRICOM_DIRECTORY_DB = tmp_path / "integricom_users.sqlite3"
+    integricom_directory.reset_init_state()
+    barrier = threading.Barrier(8)
+    errors: list[BaseException] = []
+
+    def init() -> None:
+        barrier.wait()
+        try:
+            integricom_directory.init_integricom_directory()
+        except BaseException as exc:  # pragma: no cover - reported by the assertion below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=init) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert integricom_directory.list_integricom_users() == {}
@@ -11,6 +11,7 @@ from app.processing import (
     apply_home_office_adjustment,
     build_adobe_user_allocations,
     build_breakdown,
+    build_breakdown_with_total,
     build_branch_totals,
     build_integricom_support_allocations,
     build_integricom_user_allocations,
@@ -47,6 +48,20 @@ def test_parse_csv_with_qty_and_unit_price() -> None:
     assert summary[0]["total_amount"] == 36.0
 
 
+def test_build_breakdown_with_total_sums_rounded_rows() -> None:
+    rows = [
+        {"branch": "A", "license": "X", "amount": Decimal("10.005")},
+        {"branch": "A", "license": "Y", "amount": Decimal("0.10")},
+        {"branch": "B", "license": "X", "amount": Decimal("0.20")},
+    ]
+
+    summary, total = build_breakdown_with_total(rows)
+
+    assert summary == build_breakdown(rows)
+    assert total == Decimal("10.30")
+    assert total == sum(Decimal(str(row["total_amount"])) for row in summary)
+
+
 def test_parse_hexnode_csv_maps_default_user_to_home_office() -> None:
     raw = (
         b"Device Name,Username,Department\n"
@@ -81,6 +96,8 @@ def test_home_office_adjustment_adds_to_home_office_line() -> None:
     by_branch = {row["branch"]: row["total_amount"] for row in adjusted}
     assert by_branch["Home Office"] == 80.0
     assert by_branch["Acworth"] == 10.0
+    assert summary[0]["total_amount"] == 50.0
+    assert [row["branch"] for row in adjusted] == ["Acworth", "Home Office"]
 
 
 def test_parse_adobe_csv_allocates_by_mapping_and_license_prices() -> None:
@@ -180,6 +197,46 @@ Balance Due: $20.00
     assert any("applied invoice credits" in warning.lower() for warning in parsed.warnings)
 
 
+def test_invoice_pdf_text_is_extracted_once_per_distinct_payload(monkeypatch) -> None:
+    opened: list[object] = []
+
+    class FakePage:
+        def extract_text(self):
+            return "Invoice Total: $25.00"
+
+    class FakePdfReader:
+        def __init__(self, stream):
+            opened.append(stream)
+            self.pages = [FakePage()]
+
+    monkeypatch.setitem(sys.modules, "pypdf", SimpleNamespace(PdfReader=FakePdfReader))
+
+    first = parse_integricom_invoice("invoice.pdf", b"%PDF-cache-test")
+    second = parse_integricom_invoice("invoice-again.pdf", b"%PDF-cache-test")
+
+    assert first.invoice_total == second.invoice_total == Decimal("25.00")
+    assert len(opened) == 1
+
+
+def test_invoice_pdf_text_cache_is_keyed_by_reader(monkeypatch) -> None:
+    def fake_reader(total: str):
+        class FakePage:
+            def extract_text(self):
+                return f"Invoice Total: ${total}"
+
+        class FakePdfReader:
+            def __init__(self, _stream):
+                self.pages = [FakePage()]
+
+        return FakePdfReader
+
+    monkeypatch.setitem(sys.modules, "pypdf", SimpleNamespace(PdfReader=fake_reader("25.00")))
+    assert parse_integricom_invoice("invoice.pdf", b"%PDF").invoice_total == Decimal("25.00")
+
+    monkeypatch.setitem(sys.modules, "pypdf", SimpleNamespace(PdfReader=fake_reader("40.00")))
+    assert parse_integricom_invoice("invoice.pdf", b"%PDF").invoice_total == Decimal("40.00")
+
+
 def test_build_adobe_user_allocations_returns_user_rows_and_unresolved() -> None:
     raw = (
         b"Email,First Name,Last Name,Admin Roles,User Groups,Team Products\n"
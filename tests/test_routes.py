@@ -1,10 +1,12 @@
 import asyncio
+import sqlite3
 from io import BytesIO
 from types import SimpleNamespace
 
 import pytest
 from starlette.datastructures import UploadFile
 
+from app import entra_graph, integricom_directory
 from app import main as main_module
 from app.main import STATIC_DIR, app
 
@@ -27,7 +29,7 @@ def test_launcher_html_lists_invoice_analyzer() -> None:
 
 
 def test_integricom_mode_allows_missing_csv_upload(monkeypatch) -> None:
-    async def fake_analyze_integricom(_uploads, _invoice_file, _user_updates, _branch_updates):
+    async def fake_analyze_integricom(_uploads, _invoice_file, _user_updates, _branch_updates, **_options):
         return {"vendor_type": "integricom", "ok": True}
 
     monkeypatch.setattr(main_module, "_analyze_integricom", fake_analyze_integricom)
@@ -58,6 +60,22 @@ def test_generic_mode_still_requires_csv_upload() -> None:
     assert exc.value.detail == "At least one CSV export file is required."
 
 
+def test_generic_analyze_skips_breakdown_csv_when_not_requested() -> None:
+    upload = UploadFile(filename="export.csv", file=BytesIO(b"Branch,License,Amount\nAcworth,Seat,10.00\n"))
+
+    response = asyncio.run(
+        main_module.analyze(
+            vendor_type="generic",
+            csv_files=[upload],
+            invoice_file=None,
+            include_csv=False,
+        )
+    )
+
+    assert response["breakdown_csv"] == ""
+    assert response["totals"]["grand_total"] == 10.0
+
+
 def test_adobe_directory_import_endpoint_uses_parsed_rows(monkeypatch) -> None:
     captured: dict[str, object] = {}
 
@@ -136,3 +154,155 @@ def test_append_integricom_credit_row_adds_home_office_credit_preview_row() -> N
         and row["amount"] == main_module.Decimal("-54.00")
         for row in updated_line_rows
     )
+
+
+def test_save_adobe_users_validates_payload_without_reencoding(monkeypatch) -> None:
+    captured: dict[str, object] = {}
+    monkeypatch.setattr(main_module, "upsert_adobe_users", lambda rows: captured.setdefault("upsert", rows))
+
+    result = main_module.save_adobe_users(
+        [
+            {"email": " A@Example.com ", "first_name": " A ", "last_name": "B", "branch": "Acworth"},
+            {"email": "b@example.com", "branch": ""},
+        ]
+    )
+
+    assert result == {"received": 2, "saved": 1, "skipped_blank_branch": 1}
+    assert captured["upsert"] == [
+        {"email": "a@example.com", "first_name": "A", "last_name": "B", "branch": "Acworth"}
+    ]
+
+    with pytest.raises(main_module.HTTPException) as exc:
+        main_module.save_adobe_users([{"first_name": "No Email"}])
+    assert exc.value.detail == "adobe_user_updates item 1 is missing email."
+
+
+def test_analyze_route_returns_prerendered_json_response() -> None:
+    route = next(route for route in app.routes if getattr(route, "path", None) == "/api/analyze")
+    assert route.methods == {"POST"}
+
+    async def fake_endpoint() -> dict:
+        return {"total": main_module.Decimal("1.50"), "count": main_module.Decimal("2"), "name": "Café"}
+
+    response = asyncio.run(main_module._direct_json_endpoint(fake_endpoint)())
+
+    assert response.media_type == "application/json"
+    assert response.body == '{"total":1.5,"count":2,"name":"Café"}'.encode("utf-8")
+
+
+def test_read_uploads_keeps_order_and_skips_unnamed_files() -> None:
+    uploads = [
+        UploadFile(filename="a.csv", file=BytesIO(b"first")),
+        UploadFile(filename="", file=BytesIO(b"ignored")),
+        UploadFile(filename="b.csv", file=BytesIO(b"")),
+    ]
+
+    payloads = asyncio.run(main_module._read_uploads(uploads))
+
+    assert [(upload.filename, raw) for upload, raw in payloads] == [("a.csv", b"first"), ("b.csv", b"")]
+
+
+def test_read_uploads_does_not_read_zero_size_uploads() -> None:
+    class NoReadFile(BytesIO):
+        def read(self, *args):
+            raise AssertionError("empty upload should not be read")
+
+    upload = UploadFile(filename="empty.csv", file=NoReadFile(), size=0)
+
+    payloads = asyncio.run(main_module._read_uploads([upload]))
+
+    assert payloads == [(upload, b"")]
+
+
+def test_upload_stream_rewinds_file_and_reports_size() -> None:
+    upload = UploadFile(filename="invoice.pdf", file=BytesIO(b"%PDF-body"))
+    asyncio.run(upload.read())
+
+    stream, size = asyncio.run(main_module._upload_stream(upload))
+
+    assert stream is upload.file
+    assert size == 9
+    assert stream.read() == b"%PDF-body"
+
+
+def test_serialize_missing_users_uses_given_finder() -> None:
+    user = SimpleNamespace(
+        email="gone@example.com",
+        first_name="Gone",
+        last_name="User",
+        branch="Acworth",
+        last_seen_at="2024-01-01T00:00:00+00:00",
+        created_at="ignored",
+    )
+    seen: list[set[str]] = []
+
+    def finder(current_emails: set[str]) -> list[SimpleNamespace]:
+        seen.append(current_emails)
+        return [user]
+
+    rows = main_module._serialize_missing_users(finder, {"still@example.com"})
+
+    assert seen == [{"still@example.com"}]
+    assert rows == [
+        {
+            "email": "gone@example.com",
+            "first_name": "Gone",
+            "last_name": "User",
+            "branch": "Acworth",
+            "last_seen_at": "2024-01-01T00:00:00+00:00",
+        }
+    ]
+
+
+def test_entra_sync_failing_midway_saves_profiles_but_not_last_seen(tmp_path, monkeypatch) -> None:
+    integricom_directory.INTEGRICOM_DIRECTORY_DB = tmp_path / "integricom_users.sqlite3"
+    integricom_directory.upsert_integricom_users(
+        [{"email": "a@example.com", "first_name": "Old", "last_name": "Name", "branch": "Tampa"}],
+        last_seen_at="2024-01-01T00:00:00+00:00",
+    )
+
+    def user(email: str) -> dict:
+        return {
+            "userPrincipalName": email,
+            "givenName": "New",
+            "officeLocation": "Acworth",
+            "assignedLicenses": [{"skuId": "sku-bp"}],
+        }
+
+    def fake_json_request(method: str, url: str, **_kwargs):
+        if url.startswith(f"{entra_graph.GRAPH_BASE_URL}/subscribedSkus"):
+            return {"value": [{"skuId": "sku-bp", "skuPartNumber": "SPB"}]}
+        if url == "page-2":
+            raise entra_graph.EntraSyncError("Graph request failed (503).")
+        return {"value": [user("a@example.com"), user("b@example.com")], "@odata.nextLink": "page-2"}
+
+    monkeypatch.setattr(entra_graph, "_acquire_graph_access_token", lambda: "token")
+    monkeypatch.setattr(entra_graph, "_json_request", fake_json_request)
+
+    with pytest.raises(main_module.HTTPException) as exc:
+        main_module.sync_integricom_users_from_entra_endpoint()
+    assert exc.value.status_code == 400
+
+    users = integricom_directory.list_integricom_users()
+    assert users["a@example.com"].first_name == "New"
+    assert users["a@example.com"].last_seen_at == "2024-01-01T00:00:00+00:00"
+    assert users["b@example.com"].last_seen_at is None
+
+
+def test_entra_sync_writeback_failure_returns_structured_error(monkeypatch) -> None:
+    def fake_json_request(method: str, url: str, **_kwargs):
+        if url.startswith(f"{entra_graph.GRAPH_BASE_URL}/subscribedSkus"):
+            return {"value": [{"skuId": "sku-bp", "skuPartNumber": "SPB"}]}
+        return {"value": [{"userPrincipalName": "a@example.com", "assignedLicenses": [{"skuId": "sku-bp"}]}]}
+
+    def failing_upsert(_users, **_kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(entra_graph, "_acquire_graph_access_token", lambda: "token")
+    monkeypatch.setattr(entra_graph, "_json_request", fake_json_request)
+    monkeypatch.setattr(main_module, "upsert_integricom_users", failing_upsert)
+
+    with pytest.raises(main_module.HTTPException) as exc:
+        main_module.sync_integricom_users_from_entra_endpoint()
+    assert exc.value.status_code == 500
+    assert exc.value.detail == "Directory writeback failed: database is locked"